@@ -0,0 +1,401 @@
+"""
+Bitboard position backend.
+
+Squares are numbered row * 8 + col, with row 0 being black's back rank, so the
+numbering matches the list-of-lists boards used by brain.py and the pygame
+front-ends. Bit n of every mask stands for square n.
+"""
+
+FULL = (1 << 64) - 1
+
+WHITE = 0
+BLACK = 1
+
+# Index of each piece type inside a colour's block of bitboards
+PIECE_TYPES = "pnbrqk"
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+
+FILE_A = sum(1 << (row * 8) for row in range(8))
+FILE_H = FILE_A << 7
+ROWS = [0xFF << (row * 8) for row in range(8)]
+
+
+def _build_step_table(offsets):
+    table = []
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        mask = 0
+        for d_row, d_col in offsets:
+            r, c = row + d_row, col + d_col
+            if 0 <= r < 8 and 0 <= c < 8:
+                mask |= 1 << (r * 8 + c)
+        table.append(mask)
+    return table
+
+
+def _build_ray_table(d_row, d_col):
+    table = []
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        mask = 0
+        r, c = row + d_row, col + d_col
+        while 0 <= r < 8 and 0 <= c < 8:
+            mask |= 1 << (r * 8 + c)
+            r += d_row
+            c += d_col
+        table.append(mask)
+    return table
+
+
+KNIGHT_ATTACKS = _build_step_table(
+    [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]
+)
+KING_ATTACKS = _build_step_table(
+    [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+)
+
+# Rays towards higher square numbers find their first blocker at the lowest set
+# bit, rays towards lower square numbers at the highest set bit.
+RAY_S = _build_ray_table(1, 0)
+RAY_E = _build_ray_table(0, 1)
+RAY_N = _build_ray_table(-1, 0)
+RAY_W = _build_ray_table(0, -1)
+RAY_SE = _build_ray_table(1, 1)
+RAY_SW = _build_ray_table(1, -1)
+RAY_NW = _build_ray_table(-1, -1)
+RAY_NE = _build_ray_table(-1, 1)
+
+
+def rook_attacks(sq, occupied):
+    ray = RAY_S[sq]
+    blockers = ray & occupied
+    if blockers:
+        ray ^= RAY_S[(blockers & -blockers).bit_length() - 1]
+    attacks = ray
+    ray = RAY_E[sq]
+    blockers = ray & occupied
+    if blockers:
+        ray ^= RAY_E[(blockers & -blockers).bit_length() - 1]
+    attacks |= ray
+    ray = RAY_N[sq]
+    blockers = ray & occupied
+    if blockers:
+        ray ^= RAY_N[blockers.bit_length() - 1]
+    attacks |= ray
+    ray = RAY_W[sq]
+    blockers = ray & occupied
+    if blockers:
+        ray ^= RAY_W[blockers.bit_length() - 1]
+    return attacks | ray
+
+
+def bishop_attacks(sq, occupied):
+    ray = RAY_SE[sq]
+    blockers = ray & occupied
+    if blockers:
+        ray ^= RAY_SE[(blockers & -blockers).bit_length() - 1]
+    attacks = ray
+    ray = RAY_SW[sq]
+    blockers = ray & occupied
+    if blockers:
+        ray ^= RAY_SW[(blockers & -blockers).bit_length() - 1]
+    attacks |= ray
+    ray = RAY_NW[sq]
+    blockers = ray & occupied
+    if blockers:
+        ray ^= RAY_NW[blockers.bit_length() - 1]
+    attacks |= ray
+    ray = RAY_NE[sq]
+    blockers = ray & occupied
+    if blockers:
+        ray ^= RAY_NE[blockers.bit_length() - 1]
+    return attacks | ray
+
+
+def queen_attacks(sq, occupied):
+    return rook_attacks(sq, occupied) | bishop_attacks(sq, occupied)
+
+
+class Bitboards:
+    """
+    A position stored as one 64-bit mask per piece type and colour, plus an
+    occupancy mask per colour and a 64-entry mailbox for capture lookups.
+    """
+
+    def __init__(self):
+        self.pieces = [0] * 12  # colour * 6 + piece type
+        self.occupied = [0, 0]
+        self.mailbox = [-1] * 64  # Bitboard index of the piece on each square
+        self.white_to_move = True
+        self.history = []
+
+    @classmethod
+    def from_board(cls, board, white_to_move=True):
+        """
+        Builds a position from a list-of-lists board of one-char strings.
+        """
+        position = cls()
+        position.white_to_move = white_to_move
+        for row in range(8):
+            for col in range(8):
+                piece = board[row][col]
+                if piece == " ":
+                    continue
+                color = WHITE if piece.isupper() else BLACK
+                index = color * 6 + PIECE_TYPES.index(piece.lower())
+                bit = 1 << (row * 8 + col)
+                position.pieces[index] |= bit
+                position.occupied[color] |= bit
+                position.mailbox[row * 8 + col] = index
+        return position
+
+    def to_board(self):
+        """
+        Converts the position back into a list-of-lists board.
+        """
+        board = [[" "] * 8 for _ in range(8)]
+        for sq, index in enumerate(self.mailbox):
+            if index >= 0:
+                piece = PIECE_TYPES[index % 6]
+                board[sq >> 3][sq & 7] = piece.upper() if index < 6 else piece
+        return board
+
+    def _targets(self, color):
+        """
+        Returns (from_sq, targets) pairs for every non-pawn piece of a colour.
+        Queens show up twice, once with their diagonal and once with their
+        orthogonal targets, which never overlap.
+        """
+        own = self.occupied[color]
+        occupied = own | self.occupied[color ^ 1]
+        not_own = ~own & FULL
+        pieces = self.pieces
+        base = color * 6
+        result = []
+        for attack_table, bb in (
+            (KNIGHT_ATTACKS, pieces[base + KNIGHT]),
+            (KING_ATTACKS, pieces[base + KING]),
+        ):
+            while bb:
+                lsb = bb & -bb
+                bb ^= lsb
+                sq = lsb.bit_length() - 1
+                result.append((sq, attack_table[sq] & not_own))
+        queens = pieces[base + QUEEN]
+        for slide, bb in (
+            (bishop_attacks, pieces[base + BISHOP] | queens),
+            (rook_attacks, pieces[base + ROOK] | queens),
+        ):
+            while bb:
+                lsb = bb & -bb
+                bb ^= lsb
+                sq = lsb.bit_length() - 1
+                result.append((sq, slide(sq, occupied) & not_own))
+        return result
+
+    def _pawn_targets(self, color):
+        """
+        Returns (shift, targets) pairs for every pawn move set of a colour, where
+        from_sq = to_sq + shift for every bit in targets.
+        """
+        pawns = self.pieces[color * 6 + PAWN]
+        enemy = self.occupied[color ^ 1]
+        empty = ~(self.occupied[0] | self.occupied[1]) & FULL
+        if color == WHITE:
+            single = (pawns >> 8) & empty
+            double = ((single & ROWS[5]) >> 8) & empty
+            left = ((pawns & ~FILE_A) >> 9) & enemy
+            right = ((pawns & ~FILE_H) >> 7) & enemy
+            return ((8, single), (16, double), (9, left), (7, right))
+        single = (pawns << 8) & empty
+        double = ((single & ROWS[2]) << 8) & empty
+        left = ((pawns & ~FILE_A) << 7) & enemy
+        right = ((pawns & ~FILE_H) << 9) & enemy
+        return ((-8, single), (-16, double), (-7, left), (-9, right))
+
+    def generate_moves(self):
+        """
+        Generates pseudo-legal moves for the side to move.
+
+        Returns:
+            A list of (from_sq, to_sq) tuples.
+        """
+        color = WHITE if self.white_to_move else BLACK
+        moves = []
+        for shift, targets in self._pawn_targets(color):
+            while targets:
+                lsb = targets & -targets
+                targets ^= lsb
+                to_sq = lsb.bit_length() - 1
+                moves.append((to_sq + shift, to_sq))
+        for from_sq, targets in self._targets(color):
+            while targets:
+                lsb = targets & -targets
+                targets ^= lsb
+                moves.append((from_sq, lsb.bit_length() - 1))
+        return moves
+
+    def count_moves(self):
+        """
+        Counts pseudo-legal moves for the side to move without listing them.
+        """
+        color = WHITE if self.white_to_move else BLACK
+        count = 0
+        for _, targets in self._pawn_targets(color):
+            count += targets.bit_count()
+        own = self.occupied[color]
+        occupied = own | self.occupied[color ^ 1]
+        not_own = ~own & FULL
+        pieces = self.pieces
+        base = color * 6
+        bb = pieces[base + KNIGHT]
+        while bb:
+            lsb = bb & -bb
+            bb ^= lsb
+            count += (KNIGHT_ATTACKS[lsb.bit_length() - 1] & not_own).bit_count()
+        bb = pieces[base + KING]
+        while bb:
+            lsb = bb & -bb
+            bb ^= lsb
+            count += (KING_ATTACKS[lsb.bit_length() - 1] & not_own).bit_count()
+        queens = pieces[base + QUEEN]
+        bb = pieces[base + BISHOP] | queens
+        while bb:
+            lsb = bb & -bb
+            bb ^= lsb
+            sq = lsb.bit_length() - 1
+            count += (bishop_attacks(sq, occupied) & not_own).bit_count()
+        bb = pieces[base + ROOK] | queens
+        while bb:
+            lsb = bb & -bb
+            bb ^= lsb
+            sq = lsb.bit_length() - 1
+            count += (rook_attacks(sq, occupied) & not_own).bit_count()
+        return count
+
+    def make_move(self, from_sq, to_sq):
+        """
+        Plays a move and records what is needed to take it back.
+        """
+        mailbox = self.mailbox
+        pieces = self.pieces
+        index = mailbox[from_sq]
+        captured = mailbox[to_sq]
+        color = 0 if index < 6 else 1
+        from_bit = 1 << from_sq
+        to_bit = 1 << to_sq
+        if captured >= 0:
+            pieces[captured] ^= to_bit
+            self.occupied[color ^ 1] ^= to_bit
+        pieces[index] ^= from_bit | to_bit
+        self.occupied[color] ^= from_bit | to_bit
+        mailbox[from_sq] = -1
+        mailbox[to_sq] = index
+        self.white_to_move = not self.white_to_move
+        self.history.append((from_sq, to_sq, captured))
+
+    def unmake_move(self):
+        """
+        Takes back the last move played with make_move.
+        """
+        from_sq, to_sq, captured = self.history.pop()
+        mailbox = self.mailbox
+        pieces = self.pieces
+        index = mailbox[to_sq]
+        color = 0 if index < 6 else 1
+        from_bit = 1 << from_sq
+        to_bit = 1 << to_sq
+        pieces[index] ^= from_bit | to_bit
+        self.occupied[color] ^= from_bit | to_bit
+        if captured >= 0:
+            pieces[captured] ^= to_bit
+            self.occupied[color ^ 1] ^= to_bit
+        mailbox[from_sq] = index
+        mailbox[to_sq] = captured
+        self.white_to_move = not self.white_to_move
+
+    def perft(self, depth):
+        """
+        Counts the leaf nodes of the pseudo-legal move tree to a given depth.
+        """
+        if depth == 0:
+            return 1
+        if depth == 1:
+            return self.count_moves()
+        nodes = 0
+        for from_sq, to_sq in self.generate_moves():
+            self.make_move(from_sq, to_sq)
+            nodes += self.perft(depth - 1)
+            self.unmake_move()
+        return nodes
+
+
+# Maps the one-char strings of a board to binary digits, 1 for one colour
+_WHITE_DIGITS = str.maketrans(
+    {piece: "1" if piece.isupper() else "0" for piece in "PNBRQKpnbrqk "}
+)
+_BLACK_DIGITS = str.maketrans(
+    {piece: "1" if piece.islower() else "0" for piece in "PNBRQKpnbrqk "}
+)
+
+
+def get_possible_moves(board, row, col):
+    """
+    Compatibility adapter with the same signature as brain.get_possible_moves.
+
+    Only the targets of the one piece are computed, from the attack tables and
+    the occupancy of the board, instead of building a whole Bitboards position.
+
+    Args:
+        board: A 2D list representing the chessboard.
+        row: The row index of the piece (0-7).
+        col: The column index of the piece (0-7).
+
+    Returns:
+        A list of tuples, where each tuple represents a possible move as (row, col) coordinates.
+    """
+    piece = board[row][col]
+    if piece == " ":
+        return []
+    # One character per square, reversed so square n becomes bit n
+    squares = "".join(map("".join, board))[::-1]
+    white = int(squares.translate(_WHITE_DIGITS), 2)
+    black = int(squares.translate(_BLACK_DIGITS), 2)
+    own, enemy = (white, black) if piece.isupper() else (black, white)
+
+    sq = row * 8 + col
+    kind = piece.lower()
+    if kind == "p":
+        from_bit = 1 << sq
+        empty = ~(own | enemy) & FULL
+        if piece.isupper():
+            single = (from_bit >> 8) & empty
+            targets = single | ((single & ROWS[5]) >> 8) & empty
+            targets |= (
+                ((from_bit & ~FILE_A) >> 9) | ((from_bit & ~FILE_H) >> 7)
+            ) & enemy
+        else:
+            single = (from_bit << 8) & empty
+            targets = single | ((single & ROWS[2]) << 8) & empty
+            targets |= (
+                ((from_bit & ~FILE_A) << 7) | ((from_bit & ~FILE_H) << 9)
+            ) & enemy
+    elif kind == "n":
+        targets = KNIGHT_ATTACKS[sq]
+    elif kind == "k":
+        targets = KING_ATTACKS[sq]
+    elif kind == "b":
+        targets = bishop_attacks(sq, own | enemy)
+    elif kind == "r":
+        targets = rook_attacks(sq, own | enemy)
+    else:
+        targets = queen_attacks(sq, own | enemy)
+    targets &= ~own & FULL
+
+    moves = []
+    while targets:
+        lsb = targets & -targets
+        targets ^= lsb
+        to_sq = lsb.bit_length() - 1
+        moves.append((to_sq >> 3, to_sq & 7))
+    return moves
@@ -0,0 +1,190 @@
+"""
+Memory-mapped opening book built from recorded self-play games.
+
+A book file is a flat run of fixed-width little-endian records, sorted by key:
+
+    key (8 bytes)     Zobrist key of the position, see transposition.hash_board
+    move (2 bytes)    packed move record, see brain.encode_move
+    weight (2 bytes)  how good the move did in the games it was played in
+
+Lookups binary search the file through mmap, so opening a book reads nothing
+up front and every process using the same file shares one page-cached copy.
+
+Example:
+    python chattaranj-eve.py --headless --games 1000 --output games.jsonl
+    python book.py games.jsonl --output book.bin
+"""
+
+import argparse
+import json
+import mmap
+import os
+import random
+import struct
+
+from brain import get_all_moves
+from selfplay import OPENINGS, START_BOARD, board_after
+from transposition import hash_board
+
+RECORD = struct.Struct("<QHH")
+KEY = struct.Struct("<Q")
+WEIGHT_LIMIT = 0xFFFF
+
+# Weight a move earns per game, by whether the side that played it won
+RESULT_WEIGHTS = {"win": 2, "draw": 1, "loss": 0}
+
+
+class OpeningBook:
+    """
+    Read-only view of a book file.
+
+    Args:
+        path: The book file, as written by build.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        # mmap cannot map an empty file, an empty book simply has no moves
+        self.data = (
+            mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        )
+        self.count = size // RECORD.size
+
+    def moves(self, key):
+        """
+        Looks a position up by its Zobrist key.
+
+        Returns:
+            A list of (move, weight) tuples, empty if the position is not in
+            the book.
+        """
+        data = self.data
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) >> 1
+            if KEY.unpack_from(data, middle * RECORD.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        moves = []
+        for index in range(low, self.count):
+            record_key, move, weight = RECORD.unpack_from(data, index * RECORD.size)
+            if record_key != key:
+                break
+            moves.append((move, weight))
+        return moves
+
+    def choose(self, board, color, rng=random):
+        """
+        Picks a book move for a board, at random in proportion to weight.
+
+        Returns:
+            A packed move record, or None if the position is not in the book.
+        """
+        moves = self.moves(hash_board(board, color))
+        if not moves:
+            return None
+        # A key collision could suggest a move this board does not have
+        playable = set(get_all_moves(board, color))
+        moves = [(move, weight) for move, weight in moves if move in playable]
+        if not moves:
+            return None
+        return rng.choices(
+            [move for move, _ in moves], [weight for _, weight in moves]
+        )[0]
+
+    def close(self):
+        # A file shorter than one record is still mapped, only empty ones are not
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+
+def _game_moves(game):
+    """
+    The moves of a recorded game from the standard position, including the
+    opening line of tournament games.
+    """
+    return OPENINGS.get(game.get("opening"), []) + game["moves"]
+
+
+def build(games, path, max_plies=20):
+    """
+    Writes a book of the moves played in the first plies of recorded games.
+
+    Args:
+        games: Game dicts as written by chattaranj-eve.py --headless or
+            tournament.py, which must start from the standard position.
+        path: The book file to write.
+        max_plies: Half-moves from the start of each game to take.
+
+    Returns:
+        The number of records written.
+    """
+    weights = {}
+    for game in games:
+        winner = {"1-0": "w", "0-1": "b"}.get(game["result"])
+        board = [board_row[:] for board_row in START_BOARD]
+        color = "w"
+        for name in _game_moves(game)[:max_plies]:
+            if winner is None:
+                weight = RESULT_WEIGHTS["draw"]
+            else:
+                weight = RESULT_WEIGHTS["win" if winner == color else "loss"]
+            key = hash_board(board, color)
+            from_sq = (8 - int(name[1])) * 8 + "abcdefgh".index(name[0])
+            to_sq = (8 - int(name[3])) * 8 + "abcdefgh".index(name[2])
+            move = next(
+                (
+                    move
+                    for move in get_all_moves(board, color)
+                    if move & 4095 == from_sq | to_sq << 6
+                ),
+                None,
+            )
+            if move is None:
+                break  # Not a move from this position, the record is corrupt
+            weights[(key, move)] = weights.get((key, move), 0) + weight
+            board = board_after([name], board)
+            color = "b" if color == "w" else "w"
+
+    records = sorted(
+        (key, move, min(weight, WEIGHT_LIMIT))
+        for (key, move), weight in weights.items()
+        if weight
+    )
+    with open(path, "wb") as output:
+        for record in records:
+            output.write(RECORD.pack(*record))
+    return len(records)
+
+
+def read_games(paths):
+    """
+    Yields the game dicts from JSON-lines files, skipping summary lines.
+    """
+    for path in paths:
+        with open(path) as lines:
+            for line in lines:
+                game = json.loads(line)
+                if "moves" in game:
+                    yield game
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an opening book")
+    parser.add_argument("games", nargs="+", help="JSON-lines files of games")
+    parser.add_argument("--output", default="book.bin", help="the book file")
+    parser.add_argument(
+        "--max-plies", type=int, default=20, help="half-moves taken per game"
+    )
+    args = parser.parse_args()
+
+    count = build(read_games(args.games), args.output, args.max_plies)
+    print(f"Wrote {count} book moves to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,421 @@
+"""
+The bot the player plays against in chattaranj-pve.py, and the worker process
+it thinks in so a long search never blocks the window.
+"""
+
+import logging
+import multiprocessing
+import threading
+
+import metrics
+from book import OpeningBook
+from brain import (
+    WATCHED_SQUARES,
+    encode_move,
+    get_all_moves,
+    get_possible_moves,
+    move_from,
+    move_to,
+)
+from evaluation import CENTER_BONUS, CENTER_SQUARES, PIECE_VALUES
+from search import Searcher
+from tablebase import Tablebase
+from transposition import hash_board
+
+log = logging.getLogger(__name__)
+
+
+class Piece:
+    __slots__ = (
+        "type",
+        "value",
+        "curr_pos",
+        "possible_moves",
+        "best_score",
+        "best_move",
+    )
+
+    def __init__(self):
+        self.type = " "
+        self.value = 0
+        self.curr_pos = (0, 0)
+        self.possible_moves = []  # List of tuples (x,y)
+        self.best_score = 0
+        self.best_move = (0, 0)
+
+
+class Bot:
+    def __init__(
+        self, board, time_limit=1.0, node_limit=None, book=None, tablebase=None
+    ):
+        self.pieces = {}  # Live pieces as keys, in creation order
+        self.piece_at = [None] * 64  # The live piece on each square, or None
+        self.best_piece = Piece()
+        self.last_board = []  # Flat copy of the board the move lists were built on
+        self.moved_squares = set()  # Squares the bot moved on since, to look at
+        self.searcher = Searcher(time_limit=time_limit, node_limit=node_limit)
+        self.book = book  # An OpeningBook, consulted before searching
+        self.tablebase = tablebase  # A Tablebase, consulted before searching
+        self.create_pieces(board)
+
+    def create_pieces(self, board):
+        for row in range(2):
+            for col in range(8):
+                piece = Piece()
+                piece.type = board[row][col]
+                piece.curr_pos = (row, col)
+                piece.value = PIECE_VALUES[piece.type]
+                piece.possible_moves = get_possible_moves(
+                    board, piece.curr_pos[0], piece.curr_pos[1]
+                )
+                self.choose_best_square(board, piece, piece.possible_moves)
+                self.pieces[piece] = None
+                self.piece_at[row * 8 + col] = piece
+
+        if len(self.pieces) != 16:
+            log.error("Error in piece creation...")
+            quit()
+
+        self.last_board = [piece for board_row in board for piece in board_row]
+
+    def choose_best_square(self, board, piece, possible_moves):
+        """
+        Chooses the best square to move a piece to, prioritizing capturing higher-value pieces.
+        This is a VERY simplified example.
+        """
+
+        best_score = -float("inf")  # Initialize with a very low score
+        piece.best_score = -float("inf")  # Initialize with a very low score
+
+        for move_row, move_col in possible_moves:
+            target_piece = board[move_row][move_col]
+
+            # Check if we are capturing a piece
+            if target_piece != " ":
+                score = PIECE_VALUES[target_piece]  # Value of captured piece
+            else:
+                score = 0  # No capture
+
+            #  Add a small bonus for controlling the center
+            if move_row * 8 + move_col in CENTER_SQUARES:
+                score += CENTER_BONUS
+
+            if score > best_score:
+                best_score = score
+                piece.best_score = score
+                piece.best_move = (move_row, move_col)
+
+    def capture(self, sq):
+        """
+        Forgets the piece on a square, e.g. one the player has just taken.
+        """
+        piece = self.piece_at[sq]
+        if piece is not None:
+            self.piece_at[sq] = None
+            del self.pieces[piece]
+
+    def move_piece(self, from_sq, to_sq):
+        """
+        Moves the piece on a square to another one in the index.
+
+        Returns:
+            The piece, or None if the bot has no piece on from_sq.
+        """
+        piece = self.piece_at[from_sq]
+        if piece is not None:
+            self.piece_at[from_sq] = None
+            self.piece_at[to_sq] = piece
+            piece.curr_pos = divmod(to_sq, 8)
+        return piece
+
+    def update_moves(self, board):
+        """
+        Regenerates the move lists of the pieces affected by the squares that
+        changed since the last call and picks the best piece to move.
+        """
+        squares = [piece for board_row in board for piece in board_row]
+        changed = {sq for sq in range(64) if squares[sq] != self.last_board[sq]}
+        changed |= self.moved_squares
+        self.last_board = squares
+        self.moved_squares = set()
+
+        # The player's move arrives as a whole board, so their captures are
+        # the changed squares that no longer hold the piece the bot had there
+        for sq in changed:
+            piece = self.piece_at[sq]
+            if piece is not None and squares[sq] != piece.type:
+                self.capture(sq)
+
+        top_score = -1
+        for piece in self.pieces:
+            row, col = piece.curr_pos
+            sq = row * 8 + col
+            if sq in changed or not changed.isdisjoint(WATCHED_SQUARES[piece.type][sq]):
+                piece.possible_moves = get_possible_moves(board, row, col)
+                self.choose_best_square(board, piece, piece.possible_moves)
+            if piece.best_score > top_score:
+                top_score = piece.best_score
+                self.best_piece = piece
+
+    def move(self, board, move=None):
+        """
+        Plays black's move on the board.
+
+        Args:
+            board: A 2D list representing the chessboard, modified in place.
+            move: Packed move record to play, e.g. one found while pondering.
+                Taken from the book or the tablebases, or searched for when
+                None.
+
+        Returns:
+            The board.
+        """
+        self.update_moves(board)
+
+        # Every tracked move is a search root move, the greedy pick is the
+        # fallback if the budget runs out before the first iteration ends
+        root_moves = []
+        for piece in self.pieces:
+            from_sq = piece.curr_pos[0] * 8 + piece.curr_pos[1]
+            for move_row, move_col in piece.possible_moves:
+                root_moves.append(
+                    encode_move(
+                        from_sq, move_row * 8 + move_col, board[move_row][move_col]
+                    )
+                )
+        fallback = None
+        if self.best_piece in self.pieces:
+            start_x, start_y = self.best_piece.curr_pos
+            end_x, end_y = self.best_piece.best_move
+            fallback = encode_move(
+                start_x * 8 + start_y, end_x * 8 + end_y, board[end_x][end_y]
+            )
+
+        if move is None and self.book is not None:
+            move = self.book.choose(board, "b")
+        if move is None and self.tablebase is not None:
+            move = self.tablebase.best_move(board, "b")
+        if move is None:
+            move = self.searcher.search(board, "b", root_moves, fallback)
+        self.best_piece = Piece()
+        if move is None:
+            return board
+
+        from_sq, to_sq = move_from(move), move_to(move)
+        piece = self.move_piece(from_sq, to_sq)
+        if piece is not None:
+            start_x, start_y = divmod(from_sq, 8)
+            end_x, end_y = piece.curr_pos
+            board[start_x][start_y] = " "
+            board[end_x][end_y] = piece.type
+            # Otherwise the player retaking on to_sq would look like no change
+            self.last_board[from_sq] = " "
+            self.last_board[to_sq] = piece.type
+            self.moved_squares.update((from_sq, to_sq))
+        return board
+
+    def predict_reply(self, board):
+        """
+        Guesses the player's reply to the bot's last move: the best white move
+        its search found for the board, if the transposition table kept one.
+
+        Returns:
+            A packed move record, or None if there is no guess.
+        """
+        entry = self.searcher.table.probe(hash_board(board, "w"))
+        if entry is None or not entry[3]:
+            return None
+        if entry[3] not in get_all_moves(board, "w"):
+            return None  # A key collision
+        return entry[3]
+
+    def ponder(self, board):
+        """
+        Searches black's answer to the predicted reply while the player thinks.
+        Nothing about the bot changes except what its search caches learn.
+
+        Returns:
+            A (board after the predicted reply, packed move for black) tuple,
+            or None if there was no guess or the search was stopped.
+        """
+        reply = self.predict_reply(board)
+        if reply is None:
+            return None
+        predicted = [board_row[:] for board_row in board]
+        start_x, start_y = divmod(move_from(reply), 8)
+        end_x, end_y = divmod(move_to(reply), 8)
+        predicted[end_x][end_y] = predicted[start_x][start_y]
+        predicted[start_x][start_y] = " "
+
+        move = self.searcher.search(predicted, "b")
+        stop = self.searcher.stop_event
+        if move is None or (stop is not None and stop.is_set()):
+            return None
+        return predicted, move
+
+
+class BotWorker:
+    """
+    Runs a Bot in a separate process and hands its moves back asynchronously.
+
+    Requests go to the process over a queue. A listener thread waits for the
+    replies and passes each one to on_move(request, board) as it arrives, so
+    the caller never blocks on the search. Between requests the bot ponders:
+    if the player makes the reply it predicted, the answer is ready at once.
+
+    Args:
+        board: The starting board of the game.
+        on_move: Called from the listener thread with the request id and the
+            board after the bot's move.
+        time_limit: Seconds the bot may think per move.
+        node_limit: Nodes the bot may search per move, or None.
+        book_path: Opening book file for the bot to play from, or None.
+        tablebase_dir: Directory of endgame tablebases for the bot, or None.
+        profile: Whether the process collects metrics, see metrics.py. The
+            snapshot sent with the latest reply is kept in self.metrics.
+    """
+
+    def __init__(
+        self,
+        board,
+        on_move,
+        time_limit=1.0,
+        node_limit=None,
+        book_path=None,
+        tablebase_dir=None,
+        profile=False,
+    ):
+        # Spawn rather than fork, the parent has a window and SDL threads
+        context = multiprocessing.get_context("spawn")
+        self.requests = context.Queue()
+        self.replies = context.Queue()
+        self.stop = context.Event()
+        self.last_request = 0
+        self.metrics = None
+        self.process = context.Process(
+            target=_serve,
+            args=(
+                self.requests,
+                self.replies,
+                self.stop,
+                time_limit,
+                node_limit,
+                book_path,
+                tablebase_dir,
+                profile,
+            ),
+            daemon=True,
+        )
+        self.process.start()
+        self.requests.put(("new", board))
+        self.listener = threading.Thread(
+            target=self._listen, args=(on_move,), daemon=True
+        )
+        self.listener.start()
+
+    def request_move(self, board):
+        """
+        Asks the bot to play black's move on a board.
+
+        Returns:
+            The id of the request, which the reply is tagged with.
+        """
+        self.last_request += 1
+        self.requests.put(("move", self.last_request, board))
+        return self.last_request
+
+    def cancel(self):
+        """
+        Cuts the current search short. Its reply still arrives and is best
+        ignored; every request id before the next one is stale.
+        """
+        self.stop.set()
+
+    def new_game(self, board):
+        """
+        Cancels any search and makes the bot start over from a board.
+        """
+        self.cancel()
+        self.requests.put(("new", board))
+
+    def close(self):
+        """
+        Cancels any search and shuts the process and the listener down.
+        """
+        self.cancel()
+        self.requests.put(None)
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.replies.put(None)  # Wakes the listener up to exit
+        self.listener.join(1)
+
+    def _listen(self, on_move):
+        while True:
+            reply = self.replies.get()
+            if reply is None:
+                return
+            number, board, snapshot = reply
+            if snapshot is not None:
+                self.metrics = snapshot
+            on_move(number, board)
+
+
+class _Interrupt:
+    """
+    Stop signal for the worker's searches: set by BotWorker.cancel, or by the
+    next request arriving while the bot ponders.
+    """
+
+    def __init__(self, stop, requests):
+        self.stop = stop
+        self.requests = requests
+
+    def is_set(self):
+        return self.stop.is_set() or not self.requests.empty()
+
+
+def _serve(
+    requests, replies, stop, time_limit, node_limit, book_path, tablebase_dir, profile
+):
+    """
+    Worker process entry point: plays the requested moves until told to stop.
+    """
+    if profile:
+        metrics.enable(bots=(Bot,))
+    book = None if book_path is None else OpeningBook(book_path)
+    tablebase = None if tablebase_dir is None else Tablebase(tablebase_dir)
+    bot = None
+    pondered = None  # (predicted board, packed move) from the last ponder
+    while True:
+        request = requests.get()
+        if request is None:
+            return
+        if request[0] == "new":
+            bot = Bot(
+                request[1],
+                time_limit=time_limit,
+                node_limit=node_limit,
+                book=book,
+                tablebase=tablebase,
+            )
+            bot.searcher.stop_event = _Interrupt(stop, requests)
+            pondered = None
+            if metrics.current is not None:
+                metrics.current.reset()
+        else:
+            _, number, board = request
+            stop.clear()
+            # On a wrong guess the search starts over, with warm caches
+            move = None
+            if pondered is not None and pondered[0] == board:
+                move = pondered[1]
+            board = bot.move(board, move)
+            snapshot = None
+            if metrics.current is not None:
+                if pondered is not None:
+                    hit = move is not None
+                    metrics.current.count("ponder", hits=hit, misses=not hit)
+                snapshot = metrics.current.snapshot()
+            replies.put((number, board, snapshot))
+            pondered = bot.ponder(board)
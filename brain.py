@@ -1,3 +1,6 @@
+from array import array
+
+
 def get_possible_moves(board, row, col):
     """
     Calculates the possible moves for a piece at a given position on the chessboard.
@@ -39,156 +42,266 @@ def is_valid_move(row, col):
     return 0 <= row < 8 and 0 <= col < 8
 
 
-def get_rook_moves(board, row, col):
+WHITE_PIECES = frozenset("PNBRQK")
+BLACK_PIECES = frozenset("pnbrqk")
+
+
+def _build_step_table(offsets):
     """
-    Calculates possible moves for a Rook.
+    Builds a per-square tuple of the on-board targets reached by fixed offsets.
+    """
+    table = []
+    for row in range(8):
+        for col in range(8):
+            table.append(
+                tuple(
+                    (row + d_row, col + d_col)
+                    for d_row, d_col in offsets
+                    if is_valid_move(row + d_row, col + d_col)
+                )
+            )
+    return tuple(table)
+
+
+def _build_ray_table(directions):
+    """
+    Builds a per-square tuple of rays, each ray ordered outwards from the square.
+    """
+    table = []
+    for row in range(8):
+        for col in range(8):
+            rays = []
+            for d_row, d_col in directions:
+                ray = []
+                r, c = row + d_row, col + d_col
+                while is_valid_move(r, c):
+                    ray.append((r, c))
+                    r += d_row
+                    c += d_col
+                if ray:
+                    rays.append(tuple(ray))
+            table.append(tuple(rays))
+    return tuple(table)
+
+
+def _build_pawn_push_table(step, start_row):
+    """
+    Builds a per-square tuple of the one or two squares a pawn can advance to.
+    """
+    table = []
+    for row in range(8):
+        for col in range(8):
+            pushes = []
+            if is_valid_move(row + step, col):
+                pushes.append((row + step, col))
+                if row == start_row:
+                    pushes.append((row + 2 * step, col))
+            table.append(tuple(pushes))
+    return tuple(table)
+
+
+# Attack tables indexed by row * 8 + col, built once at import
+KNIGHT_TARGETS = _build_step_table(
+    [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]
+)
+KING_TARGETS = _build_step_table(
+    [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+)
+WHITE_PAWN_CAPTURES = _build_step_table([(-1, -1), (-1, 1)])
+BLACK_PAWN_CAPTURES = _build_step_table([(1, -1), (1, 1)])
+WHITE_PAWN_PUSHES = _build_pawn_push_table(-1, 6)
+BLACK_PAWN_PUSHES = _build_pawn_push_table(1, 1)
+ROOK_RAYS = _build_ray_table([(-1, 0), (1, 0), (0, -1), (0, 1)])
+BISHOP_RAYS = _build_ray_table([(-1, -1), (-1, 1), (1, -1), (1, 1)])
+
+
+def _to_squares(targets):
+    """
+    Converts a tuple of (row, col) targets into row * 8 + col squares.
+    """
+    return tuple(row * 8 + col for row, col in targets)
+
+
+# The same tables as flat squares, for generators working on row * 8 + col
+KNIGHT_SQUARES = tuple(map(_to_squares, KNIGHT_TARGETS))
+KING_SQUARES = tuple(map(_to_squares, KING_TARGETS))
+WHITE_PAWN_CAPTURE_SQUARES = tuple(map(_to_squares, WHITE_PAWN_CAPTURES))
+BLACK_PAWN_CAPTURE_SQUARES = tuple(map(_to_squares, BLACK_PAWN_CAPTURES))
+WHITE_PAWN_PUSH_SQUARES = tuple(map(_to_squares, WHITE_PAWN_PUSHES))
+BLACK_PAWN_PUSH_SQUARES = tuple(map(_to_squares, BLACK_PAWN_PUSHES))
+ROOK_RAY_SQUARES = tuple(tuple(map(_to_squares, rays)) for rays in ROOK_RAYS)
+BISHOP_RAY_SQUARES = tuple(tuple(map(_to_squares, rays)) for rays in BISHOP_RAYS)
+QUEEN_RAY_SQUARES = tuple(
+    rook + bishop for rook, bishop in zip(ROOK_RAY_SQUARES, BISHOP_RAY_SQUARES)
+)
+
+# Per piece letter: the square table to walk and whether its entries are rays
+PIECE_SQUARE_TABLES = {
+    "n": (KNIGHT_SQUARES, False),
+    "b": (BISHOP_RAY_SQUARES, True),
+    "r": (ROOK_RAY_SQUARES, True),
+    "q": (QUEEN_RAY_SQUARES, True),
+    "k": (KING_SQUARES, False),
+}
+PIECE_SQUARE_TABLES.update(
+    {piece.upper(): table for piece, table in PIECE_SQUARE_TABLES.items()}
+)
+
+
+def _build_watch_table(tables, sliding=False):
+    """
+    Merges square tables into one frozenset of squares per square.
+    """
+    watched = []
+    for sq in range(64):
+        squares = set()
+        for table in tables:
+            if sliding:
+                for ray in table[sq]:
+                    squares.update(ray)
+            else:
+                squares.update(table[sq])
+        watched.append(frozenset(squares))
+    return tuple(watched)
+
+
+# Per piece letter and square: every square whose contents can change that
+# piece's possible moves, i.e. its rays, step targets, pushes and captures
+WATCHED_SQUARES = {
+    "P": _build_watch_table([WHITE_PAWN_PUSH_SQUARES, WHITE_PAWN_CAPTURE_SQUARES]),
+    "p": _build_watch_table([BLACK_PAWN_PUSH_SQUARES, BLACK_PAWN_CAPTURE_SQUARES]),
+    **{
+        piece: _build_watch_table([table], sliding)
+        for piece, (table, sliding) in PIECE_SQUARE_TABLES.items()
+    },
+}
+
+# Move records pack from | to << 6 | captured << 12 into 16 bits, where
+# captured is the code of the piece on the target square (0 when empty).
+PIECES = " PNBRQKpnbrqk"
+PIECE_CODES = {piece: code for code, piece in enumerate(PIECES)}
+
+
+def encode_move(from_sq, to_sq, captured=" "):
+    """
+    Packs a move and the piece letter on its target square into a move record.
+    """
+    return from_sq | to_sq << 6 | PIECE_CODES[captured] << 12
+
+
+def square_name(sq):
+    """
+    Returns the algebraic name of a row * 8 + col square, e.g. 52 -> "e2".
+    """
+    return "abcdefgh"[sq & 7] + str(8 - (sq >> 3))
+
+
+def move_from(move):
+    """
+    Returns the origin square of a packed move record.
+    """
+    return move & 63
+
+
+def move_to(move):
+    """
+    Returns the target square of a packed move record.
+    """
+    return (move >> 6) & 63
+
+
+def move_captured(move):
+    """
+    Returns the piece letter captured by a packed move record, or " ".
+    """
+    return PIECES[move >> 12]
+
+
+def _get_enemies(piece):
+    """
+    Returns the set of pieces a given piece is allowed to capture.
+    """
+    return BLACK_PIECES if piece in WHITE_PIECES else WHITE_PIECES
+
+
+def _get_ray_moves(board, rays, enemies):
+    """
+    Walks each ray outwards until it leaves the board or hits a piece.
     """
     moves = []
-    # Move upwards
-    for r in range(row - 1, -1, -1):
-        if board[r][col] == " ":
-            moves.append((r, col))
-        else:
-            if (board[r][col].islower() and board[row][col].isupper()) or (
-                board[r][col].isupper() and board[row][col].islower()
-            ):
-                moves.append((r, col))
-            break  # Stop if we encounter another piece
-
-    # Move downwards
-    for r in range(row + 1, 8):
-        if board[r][col] == " ":
-            moves.append((r, col))
-        else:
-            if (board[r][col].islower() and board[row][col].isupper()) or (
-                board[r][col].isupper() and board[row][col].islower()
-            ):
-                moves.append((r, col))
-            break  # Stop if we encounter another piece
-
-    # Move leftwards
-    for c in range(col - 1, -1, -1):
-        if board[row][c] == " ":
-            moves.append((row, c))
-        else:
-            if (board[row][c].islower() and board[row][col].isupper()) or (
-                board[row][c].isupper() and board[row][col].islower()
-            ):
-                moves.append((row, c))
-            break  # Stop if we encounter another piece
-
-    # Move rightwards
-    for c in range(col + 1, 8):
-        if board[row][c] == " ":
-            moves.append((row, c))
-        else:
-            if (board[row][c].islower() and board[row][col].isupper()) or (
-                board[row][c].isupper() and board[row][col].islower()
-            ):
-                moves.append((row, c))
-            break  # Stop if we encounter another piece
+    for ray in rays:
+        for target in ray:
+            piece = board[target[0]][target[1]]
+            if piece == " ":
+                moves.append(target)
+            else:
+                if piece in enemies:
+                    moves.append(target)
+                break  # Stop if we encounter another piece
     return moves
 
 
-def get_knight_moves(board, row, col):
+def _get_step_moves(board, targets, enemies):
     """
-    Calculates possible moves for a Knight.
+    Keeps the table targets that are empty or hold an enemy piece.
     """
     moves = []
-    possible_moves = [
-        (row - 2, col - 1),
-        (row - 2, col + 1),
-        (row - 1, col - 2),
-        (row - 1, col + 2),
-        (row + 1, col - 2),
-        (row + 1, col + 2),
-        (row + 2, col - 1),
-        (row + 2, col + 1),
-    ]
-
-    for r, c in possible_moves:
-        if is_valid_move(r, c):
-            if (
-                board[r][c] == " "
-                or (board[r][c].islower() and board[row][col].isupper())
-                or (board[r][c].isupper() and board[row][col].islower())
-            ):
-                moves.append((r, c))
+    for target in targets:
+        piece = board[target[0]][target[1]]
+        if piece == " " or piece in enemies:
+            moves.append(target)
     return moves
 
 
-def get_bishop_moves(board, row, col):
+def _get_pawn_moves(board, pushes, captures, enemies):
     """
-    Calculates possible moves for a Bishop.
+    Collects pawn advances up to the first blocked square, then captures.
     """
     moves = []
+    for target in pushes:
+        if board[target[0]][target[1]] != " ":
+            break
+        moves.append(target)
+    for target in captures:
+        if board[target[0]][target[1]] in enemies:
+            moves.append(target)
+    return moves
 
-    # Up-left diagonal
-    r, c = row - 1, col - 1
-    while is_valid_move(r, c):
-        if board[r][c] == " ":
-            moves.append((r, c))
-            r -= 1
-            c -= 1
-        else:
-            if (board[r][c].islower() and board[row][col].isupper()) or (
-                board[r][c].isupper() and board[row][col].islower()
-            ):
-                moves.append((r, c))
-            break  # Stop if we encounter another piece
-
-    # Up-right diagonal
-    r, c = row - 1, col + 1
-    while is_valid_move(r, c):
-        if board[r][c] == " ":
-            moves.append((r, c))
-            r -= 1
-            c += 1
-        else:
-            if (board[r][c].islower() and board[row][col].isupper()) or (
-                board[r][c].isupper() and board[row][col].islower()
-            ):
-                moves.append((r, c))
-            break  # Stop if we encounter another piece
-
-    # Down-left diagonal
-    r, c = row + 1, col - 1
-    while is_valid_move(r, c):
-        if board[r][c] == " ":
-            moves.append((r, c))
-            r += 1
-            c -= 1
-        else:
-            if (board[r][c].islower() and board[row][col].isupper()) or (
-                board[r][c].isupper() and board[row][col].islower()
-            ):
-                moves.append((r, c))
-            break  # Stop if we encounter another piece
-
-    # Down-right diagonal
-    r, c = row + 1, col + 1
-    while is_valid_move(r, c):
-        if board[r][c] == " ":
-            moves.append((r, c))
-            r += 1
-            c += 1
-        else:
-            if (board[r][c].islower() and board[row][col].isupper()) or (
-                board[r][c].isupper() and board[row][col].islower()
-            ):
-                moves.append((r, c))
-            break  # Stop if we encounter another piece
 
-    return moves
+def get_rook_moves(board, row, col):
+    """
+    Calculates possible moves for a Rook.
+    """
+    return _get_ray_moves(
+        board, ROOK_RAYS[row * 8 + col], _get_enemies(board[row][col])
+    )
+
+
+def get_knight_moves(board, row, col):
+    """
+    Calculates possible moves for a Knight.
+    """
+    return _get_step_moves(
+        board, KNIGHT_TARGETS[row * 8 + col], _get_enemies(board[row][col])
+    )
+
+
+def get_bishop_moves(board, row, col):
+    """
+    Calculates possible moves for a Bishop.
+    """
+    return _get_ray_moves(
+        board, BISHOP_RAYS[row * 8 + col], _get_enemies(board[row][col])
+    )
 
 
 def get_queen_moves(board, row, col):
     """
     Calculates possible moves for a Queen.
     """
-    moves = []
-    moves.extend(get_rook_moves(board, row, col))
-    moves.extend(get_bishop_moves(board, row, col))
+    enemies = _get_enemies(board[row][col])
+    moves = _get_ray_moves(board, ROOK_RAYS[row * 8 + col], enemies)
+    moves.extend(_get_ray_moves(board, BISHOP_RAYS[row * 8 + col], enemies))
     return moves
 
 
@@ -196,74 +309,116 @@ def get_king_moves(board, row, col):
     """
     Calculates possible moves for a King.
     """
-    moves = []
-    possible_moves = [
-        (row - 1, col - 1),
-        (row - 1, col),
-        (row - 1, col + 1),
-        (row, col - 1),
-        (row, col + 1),
-        (row + 1, col - 1),
-        (row + 1, col),
-        (row + 1, col + 1),
-    ]
-
-    for r, c in possible_moves:
-        if is_valid_move(r, c):
-            if (
-                board[r][c] == " "
-                or (board[r][c].islower() and board[row][col].isupper())
-                or (board[r][c].isupper() and board[row][col].islower())
-            ):
-                moves.append((r, c))
-    return moves
+    return _get_step_moves(
+        board, KING_TARGETS[row * 8 + col], _get_enemies(board[row][col])
+    )
 
 
 def get_black_pawn_moves(board, row, col):
     """
     Calculates possible moves for a black pawn.
     """
-    moves = []
-    # Move forward one square
-    if is_valid_move(row + 1, col) and board[row + 1][col] == " ":
-        moves.append((row + 1, col))
-
-    # Move forward two squares (only on the starting rank)
-    if row == 1 and board[row + 1][col] == " " and board[row + 2][col] == " ":
-        moves.append((row + 2, col))
-
-    # Capture diagonally
-    if is_valid_move(row + 1, col - 1) and board[row + 1][col - 1].isupper():
-        moves.append((row + 1, col - 1))
-    if is_valid_move(row + 1, col + 1) and board[row + 1][col + 1].isupper():
-        moves.append((row + 1, col + 1))
-
-    return moves
+    sq = row * 8 + col
+    return _get_pawn_moves(
+        board, BLACK_PAWN_PUSHES[sq], BLACK_PAWN_CAPTURES[sq], WHITE_PIECES
+    )
 
 
 def get_white_pawn_moves(board, row, col):
     """
     Calculates possible moves for a white pawn.
     """
-    moves = []
+    sq = row * 8 + col
+    return _get_pawn_moves(
+        board, WHITE_PAWN_PUSHES[sq], WHITE_PAWN_CAPTURES[sq], BLACK_PIECES
+    )
+
 
-    # Move forward one square
-    if is_valid_move(row - 1, col) and board[row - 1][col] == " ":
-        moves.append((row - 1, col))
+def get_all_moves(board, color):
+    """
+    Calculates the possible moves for every piece of one colour in a single pass.
 
-    # Move forward two squares (only on the starting rank)
-    if row == 6 and board[row - 1][col] == " " and board[row - 2][col] == " ":
-        moves.append((row - 2, col))
+    Args:
+        board: A 2D list representing the chessboard.
+        color: "w" for white or "b" for black.
 
-    # Capture diagonally
-    if is_valid_move(row - 1, col - 1) and board[row - 1][col - 1].islower():
-        moves.append((row - 1, col - 1))
-    if is_valid_move(row - 1, col + 1) and board[row - 1][col + 1].islower():
-        moves.append((row - 1, col + 1))
+    Returns:
+        An array of packed (from, to, captured) move records, see move_from,
+        move_to and move_captured. Squares are numbered row * 8 + col.
+    """
+    if color == "w":
+        own, enemies, pawn = WHITE_PIECES, BLACK_PIECES, "P"
+        pushes, captures = WHITE_PAWN_PUSH_SQUARES, WHITE_PAWN_CAPTURE_SQUARES
+    else:
+        own, enemies, pawn = BLACK_PIECES, WHITE_PIECES, "p"
+        pushes, captures = BLACK_PAWN_PUSH_SQUARES, BLACK_PAWN_CAPTURE_SQUARES
+
+    squares = [piece for board_row in board for piece in board_row]
+    codes = PIECE_CODES
+    tables = PIECE_SQUARE_TABLES
+    moves = array("H")
+    append = moves.append
+
+    for sq in range(64):
+        piece = squares[sq]
+        if piece not in own:
+            continue
+
+        if piece == pawn:
+            for to_sq in pushes[sq]:
+                if squares[to_sq] != " ":
+                    break
+                append(sq | to_sq << 6)
+            for to_sq in captures[sq]:
+                target = squares[to_sq]
+                if target in enemies:
+                    append(sq | to_sq << 6 | codes[target] << 12)
+            continue
+
+        table, sliding = tables[piece]
+        if sliding:
+            for ray in table[sq]:
+                for to_sq in ray:
+                    target = squares[to_sq]
+                    if target == " ":
+                        append(sq | to_sq << 6)
+                    else:
+                        if target in enemies:
+                            append(sq | to_sq << 6 | codes[target] << 12)
+                        break  # Stop if we encounter another piece
+        else:
+            for to_sq in table[sq]:
+                target = squares[to_sq]
+                if target == " ":
+                    append(sq | to_sq << 6)
+                elif target in enemies:
+                    append(sq | to_sq << 6 | codes[target] << 12)
 
     return moves
 
 
+def get_move_set(board, color):
+    """
+    Collects every possible move of one colour for constant-time validation.
+
+    Args:
+        board: A 2D list representing the chessboard.
+        color: "w" for white or "b" for black.
+
+    Returns:
+        A frozenset of from | to << 6 keys, squares numbered row * 8 + col.
+        Compute it once per turn and check moves with validate_move.
+    """
+    return frozenset(move & 4095 for move in get_all_moves(board, color))
+
+
+def validate_move(move_set, start_x, start_y, end_x, end_y):
+    """
+    Checks a move against a move set from get_move_set with a single lookup.
+    """
+    return (start_x * 8 + start_y) | (end_x * 8 + end_y) << 6 in move_set
+
+
 # Example Usage
 if __name__ == "__main__":
     board = [
@@ -298,3 +453,10 @@ if __name__ == "__main__":
     print(
         f"Possible moves for white pawn at ({pawn_row}, {pawn_col}): {possible_moves_pawn}"
     )
+
+    # Example: Get every possible move for black in one call
+    black_moves = get_all_moves(board, "b")
+    print(
+        f"Black has {len(black_moves)} possible moves: "
+        f"{[(move_from(move), move_to(move)) for move in black_moves]}"
+    )
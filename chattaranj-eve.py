@@ -1,11 +1,15 @@
+import os
+
+# Set before pygame is imported, to keep headless stdout clean
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
 import pygame
 import sys
-import math
-import time
-import random
-
-# Initialize Pygame
-pygame.init()
+import argparse
+import json
+import logging
+import metrics
+from render import LOOP_EVENTS, BoardRenderer, wait_for_events
+from selfplay import RandomBot, play_game
 
 # Constants for the display
 BOARD_SIZE = 8
@@ -13,28 +17,19 @@ SQUARE_SIZE = 120
 WIDTH, HEIGHT = BOARD_SIZE * SQUARE_SIZE, BOARD_SIZE * SQUARE_SIZE
 COLOR_1 = (253, 232, 182)
 COLOR_2 = (88, 57, 39)
+FPS = 60  # Frame rate cap
 
-# Create a window
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Simple Chess Game")
+log = logging.getLogger(__name__)
 
+# The window is only created for windowed games, see init_display
+screen = None
 
-class Bot:
-    def move(self, board, is_white):
-        while True:
-            start_x = random.randint(0, 7)
-            start_y = random.randint(0, 7)
-            end_x = random.randint(0, 7)
-            end_y = random.randint(0, 7)
-            piece = board[start_x][start_y]
-            print(
-                f"Attempting to move {piece} from {start_x, start_y} to {end_x, end_y}"
-            )
-            if validate_move(piece, board, start_x, end_x, start_y, end_y, is_white):
-                board[start_x][start_y] = " "
-                board[end_x][end_y] = piece
-                break
-        return board
+
+def init_display():
+    global screen
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Simple Chess Game")
 
 
 class Game:
@@ -55,7 +50,7 @@ class Game:
                             piece_images[piece_name], (SQUARE_SIZE, SQUARE_SIZE)
                         )
                     except pygame.error:
-                        print(f"Could not load image for {color}_{piece}")
+                        log.warning("Could not load image for %s_%s", color, piece)
             return piece_images
 
         self.board = [
@@ -70,194 +65,97 @@ class Game:
         ]
 
         self.piece_icons = load_piece_icons()
+        self.renderer = BoardRenderer(
+            screen, self.piece_icons, SQUARE_SIZE, (COLOR_1, COLOR_2)
+        )
 
     def move(self, bot, is_white):
-        display_temp_text(f'{"WHITE" if is_white else "BLACK"} TURN', 1)
-        self.board = bot.move(self.board, is_white)
-
-
-def validate_move(piece, board, start_x, end_x, start_y, end_y, is_white):
-    target = board[end_x][end_y]
-    # Ensure there is a piece at the start position and it's the player's piece
-    if (
-        piece == " "
-        or (is_white and piece.islower())
-        or (not is_white and piece.isupper())
-    ):
-        return False
-
-    # Ensure the target space is not occupied by a piece of the same color
-    if (is_white and target.isupper()) or (not is_white and target.islower()):
-        return False
-
-    # Piece movement rules
-    if piece.lower() == "p":  # Pawn movement
-        if is_white:
-            if (
-                start_x == 6
-                and end_x == 4
-                and start_y == end_y
-                and board[5][start_y] == " "
-                and board[4][start_y] == " "
-            ):
-                return True  # First double move
-            if end_x == start_x - 1 and start_y == end_y and target == " ":
-                return True  # Single move forward
-            if end_x == start_x - 1 and abs(start_y - end_y) == 1 and target.islower():
-                return True  # Capture diagonally
-        else:
-            if (
-                start_x == 1
-                and end_x == 3
-                and start_y == end_y
-                and board[2][start_y] == " "
-                and board[3][start_y] == " "
-            ):
-                return True  # First double move
-            if end_x == start_x + 1 and start_y == end_y and target == " ":
-                return True  # Single move forward
-            if end_x == start_x + 1 and abs(start_y - end_y) == 1 and target.isupper():
-                return True  # Capture diagonally
-
-    elif piece.lower() == "r":  # Rook movement
-        if start_x == end_x:  # Horizontal move
-            step = 1 if start_y < end_y else -1
-            for y in range(start_y + step, end_y, step):
-                if board[start_x][y] != " ":
-                    return False
-            return True
-        elif start_y == end_y:  # Vertical move
-            step = 1 if start_x < end_x else -1
-            for x in range(start_x + step, end_x, step):
-                if board[x][start_y] != " ":
-                    return False
-            return True
-
-    elif piece.lower() == "n":  # Knight movement
-        if (abs(start_x - end_x), abs(start_y - end_y)) in [(2, 1), (1, 2)]:
-            return True
-
-    elif piece.lower() == "b":  # Bishop movement
-        if abs(start_x - end_x) == abs(start_y - end_y):
-            x_step = 1 if end_x > start_x else -1
-            y_step = 1 if end_y > start_y else -1
-            x, y = start_x + x_step, start_y + y_step
-            while x != end_x and y != end_y:
-                if board[x][y] != " ":
-                    return False
-                x += x_step
-                y += y_step
-            return True
-
-    elif piece == "q":
-        if validate_move(
-            piece="r",
-            board=board,
-            start_x=start_x,
-            end_x=end_x,
-            start_y=start_y,
-            end_y=end_y,
-            is_white=False,
-        ) or validate_move(
-            piece="b",
-            board=board,
-            start_x=start_x,
-            end_x=end_x,
-            start_y=start_y,
-            end_y=end_y,
-            is_white=False,
-        ):
-            return True
-
-    elif piece == "Q":
-        if validate_move(
-            piece="R",
-            board=board,
-            start_x=start_x,
-            end_x=end_x,
-            start_y=start_y,
-            end_y=end_y,
-            is_white=True,
-        ) or validate_move(
-            piece="B",
-            board=board,
-            start_x=start_x,
-            end_x=end_x,
-            start_y=start_y,
-            end_y=end_y,
-            is_white=True,
-        ):
-            return True
-
-    elif piece.lower() == "k":  # King movement
-        if abs(start_x - end_x) <= 1 and abs(start_y - end_y) <= 1:
-            return True
-
-    return False
-
-
-# Function to draw the chessboard
-def draw_board():
-    for row in range(BOARD_SIZE):
-        for col in range(BOARD_SIZE):
-            color = COLOR_1 if (row + col) % 2 == 0 else COLOR_2
-            pygame.draw.rect(
-                screen,
-                color,
-                pygame.Rect(
-                    col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE
-                ),
-            )
-
-
-# Function to draw pieces using images
-def draw_pieces(piece_images, board):
-    for row in range(BOARD_SIZE):
-        for col in range(BOARD_SIZE):
-            piece = board[row][col]
-            if piece != " ":
-                color = "w" if piece.isupper() else "b"
-                piece_type = piece.lower()
-                image_key = f"{color}_{piece_type}"
-                screen.blit(
-                    piece_images[image_key], (col * SQUARE_SIZE, row * SQUARE_SIZE)
-                )
-
-
-def display_temp_text(message, duration):
-    BLACK = (0, 0, 0)
-    font = pygame.font.SysFont("Arial", 50)
-    start_time = time.time()
-
-    while time.time() - start_time < duration:
-        # screen.fill(BLACK)  # Clear screen
-        # Render and display the message
-        text = font.render(message, True, BLACK)
-        text_rect = text.get_rect(center=(WIDTH // 2, HEIGHT // 2))
-        screen.blit(text, text_rect)  # Display the text at a position
-        pygame.display.flip()
-        pygame.time.wait(10)  # Small delay to keep screen responsive
+        """
+        Lets the bot play one move. Returns False if it has none to play.
+        """
+        board = bot.move(self.board, is_white)
+        if board is None:
+            return False
+        self.board = board
+        return True
+
+
+def run_headless(games, max_plies, output, profile=None):
+    """
+    Plays bot-vs-bot games without a window and writes one JSON line per game,
+    and their metrics to the profile file if one is given.
+    """
+    bot = RandomBot(verbose=False)
+    out = open(output, "w") if output else sys.stdout
+    try:
+        for number in range(games):
+            result = play_game(bot, bot, max_plies=max_plies)
+            result["game"] = number + 1
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            metrics.end_game(profile, front_end="eve", game=number + 1)
+    finally:
+        if out is not sys.stdout:
+            out.close()
 
 
 # Main game loop
 def main():
+    parser = argparse.ArgumentParser(description="Bot-vs-bot chess")
+    parser.add_argument("--headless", action="store_true", help="play without a window")
+    parser.add_argument("--games", type=int, default=1, help="headless games to play")
+    parser.add_argument(
+        "--max-plies", type=int, default=200, help="half-moves before a draw"
+    )
+    parser.add_argument("--output", help="write headless results to this file")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.configure_logging(args.log_level)
+    if args.profile:
+        metrics.enable(bots=(RandomBot,), renderer=BoardRenderer)
+    if args.cprofile:
+        metrics.start_cprofile(args.cprofile)
+
+    if args.headless:
+        run_headless(args.games, args.max_plies, args.output, args.profile)
+        return
+
+    init_display()
     game = Game()
-    bot = Bot()
+    bot = RandomBot()
+    clock = pygame.time.Clock()
+    pygame.event.set_blocked(None)
+    pygame.event.set_allowed(LOOP_EVENTS)
 
     is_white = True
+    finished = False
+    game.renderer.show_text("WHITE TURN", 1)
 
     while True:
-        for event in pygame.event.get():
+        for event in wait_for_events(game.renderer.timeout()):
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                game.renderer.invalidate()
+
             if event.type == pygame.QUIT:
+                metrics.end_game(args.profile, front_end="eve")
                 pygame.quit()
                 sys.exit()
 
-        game.move(bot, is_white)
-
-        draw_board()
-        draw_pieces(game.piece_icons, game.board)
-        is_white = not is_white  # Flip turn
-        pygame.display.flip()
+        # Each turn's banner stays up for a second before that side moves
+        if not game.renderer.showing_text():
+            if finished:
+                metrics.end_game(args.profile, front_end="eve")
+                pygame.quit()
+                sys.exit()
+            if game.move(bot, is_white):
+                is_white = not is_white  # Flip turn
+                game.renderer.show_text(f'{"WHITE" if is_white else "BLACK"} TURN', 1)
+            else:
+                finished = True
+                game.renderer.show_text("STALEMATE", 2)
+
+        game.renderer.render(game.board)
+        clock.tick(FPS)
 
 
 # Run the game
@@ -0,0 +1,90 @@
+"""
+Evaluation terms shared by the bots, the search and the move ordering.
+
+Every piece has one centipawn value and a middlegame and an endgame
+piece-square table. A position's score is its material plus piece-square sum
+for each phase, blended by how much material is left: with all the pieces on
+the board it is the middlegame score, with only kings and pawns the endgame
+one. position.Position keeps both sums up to date move by move, so the search
+reads them instead of scanning the board.
+"""
+
+from brain import PIECES
+
+# Centipawn value of each piece, by piece letter
+PIECE_VALUES = {"p": 100, "n": 300, "b": 300, "r": 500, "q": 900, "k": 0}
+PIECE_VALUES.update({piece.upper(): value for piece, value in PIECE_VALUES.items()})
+PIECE_VALUES[" "] = 0
+
+CENTER_SQUARES = (27, 28, 35, 36)
+CENTER_BONUS = 10
+
+# How much each piece counts towards the middlegame, by piece letter
+PHASE_WEIGHTS = {"n": 1, "b": 1, "r": 2, "q": 4}
+# The phase of the starting position, the most a position counts as
+PHASE_TOTAL = 24
+
+
+def _centrality(sq):
+    """
+    0 in the corners up to 6 on the four centre squares.
+    """
+    row, col = divmod(sq, 8)
+    return 7 - (abs(2 * row - 7) + abs(2 * col - 7)) // 2
+
+
+def _table(score):
+    return tuple(score(sq, _centrality(sq)) for sq in range(64))
+
+
+def _center_only(sq, centrality):
+    return CENTER_BONUS if sq in CENTER_SQUARES else 0
+
+
+# Piece-square bonuses for white's pieces, by piece letter; black's pieces use
+# the table of the same piece mirrored top to bottom
+MIDDLEGAME_TABLES = {
+    "P": _table(_center_only),
+    "N": _table(lambda sq, centrality: 5 * centrality - 15),
+    "B": _table(lambda sq, centrality: 3 * centrality - 9),
+    "R": _table(_center_only),
+    "Q": _table(lambda sq, centrality: 2 * centrality - 6),
+    # Tucked away from the fight while there is material to attack it
+    "K": _table(lambda sq, centrality: -5 * centrality),
+}
+ENDGAME_TABLES = dict(MIDDLEGAME_TABLES)
+# With the board emptied the king joins in
+ENDGAME_TABLES["K"] = _table(lambda sq, centrality: 5 * centrality - 15)
+
+
+def _code_scores(tables):
+    """
+    Per piece code and square, material plus piece-square bonus from white's
+    point of view, negative for black's pieces and zero for empty squares.
+    """
+    scores = []
+    for piece in PIECES:
+        if piece == " ":
+            scores.append((0,) * 64)
+        elif piece.isupper():
+            table = tables[piece]
+            scores.append(tuple(PIECE_VALUES[piece] + table[sq] for sq in range(64)))
+        else:
+            table = tables[piece.upper()]
+            scores.append(
+                tuple(-PIECE_VALUES[piece] - table[sq ^ 56] for sq in range(64))
+            )
+    return scores
+
+
+MIDDLEGAME_SCORES = _code_scores(MIDDLEGAME_TABLES)
+ENDGAME_SCORES = _code_scores(ENDGAME_TABLES)
+PHASE_CODES = [PHASE_WEIGHTS.get(piece.lower(), 0) for piece in PIECES]
+
+
+def tapered(middlegame, endgame, phase):
+    """
+    Blends a middlegame and an endgame score by the phase of a position.
+    """
+    phase = min(phase, PHASE_TOTAL)
+    return (middlegame * phase + endgame * (PHASE_TOTAL - phase)) // PHASE_TOTAL
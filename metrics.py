@@ -0,0 +1,314 @@
+"""
+Opt-in engine and front-end metrics, and the logging setup of the scripts.
+
+Nothing is measured until enable() is called. It replaces the functions worth
+watching with timing and counting wrappers, so a run without --profile calls
+the originals and pays nothing. Metrics are kept per process: the pve bot's
+worker enables its own and sends them back with its moves.
+
+Example:
+    python chattaranj-eve.py --headless --games 10 --profile metrics.jsonl
+    python chattaranj-pve.py --profile metrics.jsonl --cprofile pve.prof
+    python -m pstats pve.prof
+"""
+
+import atexit
+import cProfile
+import functools
+import json
+import logging
+import sys
+import time
+
+import brain
+from book import OpeningBook
+from position import Position
+from search import Searcher
+from tablebase import Tablebase
+
+LOG_LEVELS = ("debug", "info", "warning", "error")
+
+# Names the movegen counts use, by black's piece letter
+PIECE_TYPES = {
+    "p": "pawn",
+    "n": "knight",
+    "b": "bishop",
+    "r": "rook",
+    "q": "queen",
+    "k": "king",
+}
+
+# The per-piece generators of brain.py, by the piece type they count for
+PIECE_GENERATORS = {
+    "get_white_pawn_moves": "pawn",
+    "get_black_pawn_moves": "pawn",
+    "get_knight_moves": "knight",
+    "get_bishop_moves": "bishop",
+    "get_rook_moves": "rook",
+    "get_queen_moves": "queen",
+    "get_king_moves": "king",
+}
+
+current = None  # The Metrics being collected, None while disabled
+
+
+class Metrics:
+    """
+    Counters and timings collected since the last reset.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.moves = []  # (seconds, nodes) per bot move
+        self.searches = 0
+        self.nodes = 0
+        self.movegen = dict.fromkeys(PIECE_TYPES.values(), 0)
+        self.caches = {}  # Name to [hits, misses]
+        self.frames = 0
+        self.frames_drawn = 0
+        self.frame_seconds = 0.0
+        self.slowest_frame = 0.0
+
+    def count(self, cache, hits=0, misses=0):
+        """
+        Adds lookups of a cache, e.g. count("book", hits=1).
+        """
+        counts = self.caches.setdefault(cache, [0, 0])
+        counts[0] += hits
+        counts[1] += misses
+
+    def snapshot(self):
+        """
+        Summarises the metrics as a dict that can be written as JSON.
+        """
+        seconds = sum(move_seconds for move_seconds, _ in self.moves)
+        return {
+            "bot_moves": {
+                "count": len(self.moves),
+                "total_ms": round(1000 * seconds, 3),
+                "max_ms": round(1000 * max((s for s, _ in self.moves), default=0), 3),
+                "moves": [
+                    {"ms": round(1000 * move_seconds, 3), "nodes": nodes}
+                    for move_seconds, nodes in self.moves
+                ],
+            },
+            "search": {"searches": self.searches, "nodes": self.nodes},
+            "movegen": dict(self.movegen),
+            "caches": {
+                cache: {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": (
+                        round(hits / (hits + misses), 4) if hits + misses else None
+                    ),
+                }
+                for cache, (hits, misses) in self.caches.items()
+            },
+            "frames": {
+                "count": self.frames,
+                "drawn": self.frames_drawn,
+                "avg_ms": (
+                    round(1000 * self.frame_seconds / self.frames, 3)
+                    if self.frames
+                    else None
+                ),
+                "max_ms": round(1000 * self.slowest_frame, 3),
+            },
+        }
+
+
+def _replace(owner, name, make_wrapper):
+    """
+    Wraps a function, both on its owner and wherever it was imported by name.
+    """
+    original = getattr(owner, name)
+    wrapper = functools.wraps(original)(make_wrapper(original))
+    setattr(owner, name, wrapper)
+    for module in list(sys.modules.values()):
+        if getattr(module, name, None) is original:
+            setattr(module, name, wrapper)
+
+
+def _count_piece_generator(piece_type):
+    def make_wrapper(original):
+        def wrapper(*args, **kwargs):
+            current.movegen[piece_type] += 1
+            return original(*args, **kwargs)
+
+        return wrapper
+
+    return make_wrapper
+
+
+def _count_board_generator(original):
+    # One count per piece of the side to move, like the per-piece generators
+    def wrapper(board, color):
+        squares = [piece for board_row in board for piece in board_row]
+        for letter, piece_type in PIECE_TYPES.items():
+            current.movegen[piece_type] += squares.count(
+                letter.upper() if color == "w" else letter
+            )
+        return original(board, color)
+
+    return wrapper
+
+
+def _count_position_generator(original):
+    codes = [
+        (brain.PIECE_CODES[letter.upper()], brain.PIECE_CODES[letter], piece_type)
+        for letter, piece_type in PIECE_TYPES.items()
+    ]
+
+    def wrapper(position):
+        squares = position.squares
+        for white_code, black_code, piece_type in codes:
+            current.movegen[piece_type] += squares.count(
+                white_code if position.white_to_move else black_code
+            )
+        return original(position)
+
+    return wrapper
+
+
+def _measure_search(original):
+    def wrapper(searcher, *args, **kwargs):
+        table = searcher.table
+        hits, misses = table.hits, table.misses
+        move = original(searcher, *args, **kwargs)
+        current.searches += 1
+        current.nodes += searcher.nodes
+        current.count(
+            "transposition", hits=table.hits - hits, misses=table.misses - misses
+        )
+        return move
+
+    return wrapper
+
+
+def _count_lookup(cache):
+    def make_wrapper(original):
+        def wrapper(*args, **kwargs):
+            move = original(*args, **kwargs)
+            current.count(cache, hits=move is not None, misses=move is None)
+            return move
+
+        return wrapper
+
+    return make_wrapper
+
+
+def _time_bot_move(original):
+    def wrapper(bot, *args, **kwargs):
+        nodes = current.nodes
+        start = time.perf_counter()
+        board = original(bot, *args, **kwargs)
+        current.moves.append((time.perf_counter() - start, current.nodes - nodes))
+        return board
+
+    return wrapper
+
+
+def _time_frame(original):
+    def wrapper(renderer, *args, **kwargs):
+        start = time.perf_counter()
+        rects = original(renderer, *args, **kwargs)
+        seconds = time.perf_counter() - start
+        current.frames += 1
+        current.frames_drawn += bool(rects)
+        current.frame_seconds += seconds
+        current.slowest_frame = max(current.slowest_frame, seconds)
+        return rects
+
+    return wrapper
+
+
+def enable(bots=(), renderer=None):
+    """
+    Starts collecting metrics in this process. Calling it again only adds
+    the bots and renderer not watched yet.
+
+    Args:
+        bots: Bot classes whose move method to time, e.g. selfplay.RandomBot.
+        renderer: The render.BoardRenderer class, to time its frames.
+
+    Returns:
+        The Metrics being collected.
+    """
+    global current
+    if current is None:
+        current = Metrics()
+        for name, piece_type in PIECE_GENERATORS.items():
+            _replace(brain, name, _count_piece_generator(piece_type))
+        _replace(brain, "get_all_moves", _count_board_generator)
+        _replace(Position, "generate_moves", _count_position_generator)
+        _replace(Searcher, "search", _measure_search)
+        _replace(OpeningBook, "choose", _count_lookup("book"))
+        _replace(Tablebase, "best_move", _count_lookup("tablebase"))
+
+    for bot in bots:
+        if not getattr(bot.move, "_metrics", False):
+            _replace(bot, "move", _time_bot_move)
+            bot.move._metrics = True
+    if renderer is not None and not getattr(renderer.render, "_metrics", False):
+        _replace(renderer, "render", _time_frame)
+        renderer.render._metrics = True
+    return current
+
+
+def end_game(path, **fields):
+    """
+    Appends the metrics of a game as a JSON line and starts over for the
+    next one. Does nothing unless metrics are enabled and path is set.
+
+    Args:
+        path: The JSON-lines file, as given to --profile, or None.
+        fields: Extra keys for the line, e.g. the front-end's name.
+    """
+    if current is None or path is None:
+        return
+    line = dict(fields, **current.snapshot())
+    with open(path, "a") as out:
+        out.write(json.dumps(line) + "\n")
+    current.reset()
+
+
+def start_cprofile(path):
+    """
+    Profiles the rest of the run with cProfile and writes the stats to path
+    when the interpreter exits, sys.exit included.
+    """
+    profiler = cProfile.Profile()
+    atexit.register(_dump_cprofile, profiler, path)
+    profiler.enable()
+
+
+def _dump_cprofile(profiler, path):
+    profiler.disable()
+    profiler.dump_stats(path)
+
+
+def add_arguments(parser):
+    """
+    Adds the --profile, --cprofile and --log-level options of the front-ends.
+    """
+    parser.add_argument(
+        "--profile", metavar="FILE", help="append per-game metrics as JSON lines"
+    )
+    parser.add_argument(
+        "--cprofile", metavar="FILE", help="write cProfile stats of the main process"
+    )
+    parser.add_argument(
+        "--log-level", choices=LOG_LEVELS, default="warning", help="log verbosity"
+    )
+
+
+def configure_logging(level):
+    """
+    Sends log records at or above a level name from LOG_LEVELS to stderr.
+    """
+    logging.basicConfig(
+        level=getattr(logging, level.upper()),
+        format="%(levelname)s %(name)s: %(message)s",
+    )
@@ -0,0 +1,114 @@
+"""
+Move ordering for the alpha-beta search: captures by MVV-LVA, then killer
+moves, then quiet moves by the history heuristic.
+"""
+
+from array import array
+
+from brain import PIECES
+from evaluation import PIECE_VALUES
+
+# Piece values in pawns, by piece letter
+ORDER_VALUES = {piece: value // 100 for piece, value in PIECE_VALUES.items()}
+# The king has no material value but is the costliest piece to lose, since
+# losing it loses the game. It counts above a queen, so a capture by the king
+# is tried after the same capture by any other piece, and taking a king first.
+ORDER_VALUES["k"] = ORDER_VALUES["K"] = ORDER_VALUES["q"] + 1
+
+# Most valuable victim first, by captured code; least valuable attacker first
+VICTIM_SCORES = [ORDER_VALUES[piece] * 16 for piece in PIECES]
+ATTACKER_VALUES = [ORDER_VALUES[piece] for piece in PIECES]
+
+TT_MOVE_SCORE = 1 << 30
+CAPTURE_SCORE = 1 << 29
+KILLER_SCORES = (1 << 28, (1 << 28) - 1)
+HISTORY_LIMIT = 1 << 24
+
+
+class MoveOrderer:
+    """
+    Keeps killer moves per ply and a from/to history table across a search.
+
+    Args:
+        max_ply: Number of plies to keep killer moves for.
+    """
+
+    def __init__(self, max_ply=128):
+        self.killers = [[0, 0] for _ in range(max_ply)]
+        self.history = array("I", bytes(4 * 4096))  # Indexed by from | to << 6
+
+    def new_search(self):
+        """
+        Forgets the killers and ages the history before a new search.
+        """
+        for killers in self.killers:
+            killers[0] = killers[1] = 0
+        history = self.history
+        for index in range(4096):
+            history[index] >>= 1
+
+    def order(self, squares, moves, ply, tt_move=0):
+        """
+        Sorts packed move records from most to least promising.
+
+        Args:
+            squares: Piece codes by square of the position the moves belong
+                to, see position.Position.
+            moves: Packed move records, see brain.get_all_moves.
+            ply: Distance from the root, for killer lookups.
+            tt_move: Packed move record from the transposition table, tried
+                first when it is among the moves.
+
+        Returns:
+            A new list of the moves, best first.
+        """
+        killer_1, killer_2 = self.killers[ply] if ply < len(self.killers) else (0, 0)
+        history = self.history
+        scored = []
+        for move in moves:
+            if move == tt_move:
+                score = TT_MOVE_SCORE
+            elif move >> 12:
+                score = (
+                    CAPTURE_SCORE
+                    + VICTIM_SCORES[move >> 12]
+                    - ATTACKER_VALUES[squares[move & 63]]
+                )
+            elif move == killer_1:
+                score = KILLER_SCORES[0]
+            elif move == killer_2:
+                score = KILLER_SCORES[1]
+            else:
+                score = history[move & 4095]
+            scored.append((score, move))
+        scored.sort(reverse=True)
+        return [move for _, move in scored]
+
+    def order_captures(self, squares, moves):
+        """
+        Sorts capture records by MVV-LVA alone, for the quiescence search.
+        """
+        scored = []
+        for move in moves:
+            attacker = ATTACKER_VALUES[squares[move & 63]]
+            scored.append((VICTIM_SCORES[move >> 12] - attacker, move))
+        scored.sort(reverse=True)
+        return [move for _, move in scored]
+
+    def record_cutoff(self, move, depth, ply):
+        """
+        Rewards a quiet move that caused a beta cutoff.
+        """
+        if move >> 12:
+            return
+        if ply < len(self.killers):
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        history = self.history
+        index = move & 4095
+        history[index] += depth * depth
+        if history[index] >= HISTORY_LIMIT:
+            for index in range(4096):
+                history[index] >>= 1
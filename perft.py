@@ -0,0 +1,333 @@
+"""
+Perft benchmark and correctness suite for the move generators.
+
+Counts the leaf nodes of the move tree to a given depth from a set of standard
+positions, for every backend, and reports nodes per second as JSON. Every
+backend is checked against brain.get_possible_moves, and the counts against
+known values for the rules the front-ends play by: pseudo-legal moves, no
+castling, en passant or promotion, and the king can be captured.
+
+With --legal the tree holds only the moves that do not leave the mover's king
+attacked, as generated by Position.legal_moves, and is checked against a
+reference that plays every pseudo-legal move and rescans for attacks on the
+king. Capturing the enemy king stays legal and a side without a king keeps
+all its moves.
+
+Example:
+    python perft.py --depth 3 --backends reference batched bitboard mailbox
+    python perft.py --legal --depth 4 --positions start
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from bitboard import Bitboards
+from brain import PIECE_CODES, get_all_moves, get_possible_moves, square_name
+from position import Position
+
+POSITIONS = {
+    "start": "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w",
+    "kiwipete": "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w",
+    "endgame": "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w",
+    "mirrored": "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w",
+    "talkchess": "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w",
+}
+
+# Leaf counts per depth, starting at depth 1, under this repo's rules
+EXPECTED = {
+    "start": [20, 400, 8902, 197742],
+    "kiwipete": [46, 1870, 87218],
+    "endgame": [16, 276, 4820, 89009],
+    "mirrored": [38, 1549, 60977],
+    "talkchess": [40, 1394, 58044],
+}
+
+# The same for the legal move tree
+LEGAL_EXPECTED = {
+    "start": [20, 400, 8902, 197281],
+    "kiwipete": [46, 1865, 86585],
+    "endgame": [14, 191, 2810, 43087],
+    "mirrored": [6, 222, 7861],
+    "talkchess": [40, 1349, 51751],
+}
+
+
+def board_from_fen(fen):
+    """
+    Parses the piece placement and side to move fields of a FEN string.
+
+    Returns:
+        A (board, color) tuple with a list-of-lists board and "w" or "b".
+    """
+    fields = fen.split()
+    board = []
+    for rank in fields[0].split("/"):
+        row = []
+        for char in rank:
+            row.extend(" " * int(char) if char.isdigit() else char)
+        board.append(row)
+    return board, fields[1] if len(fields) > 1 else "w"
+
+
+def _reference_moves(board, color):
+    moves = []
+    for row in range(8):
+        for col in range(8):
+            piece = board[row][col]
+            if piece != " " and piece.isupper() == (color == "w"):
+                for to_row, to_col in get_possible_moves(board, row, col):
+                    moves.append((row * 8 + col, to_row * 8 + to_col))
+    return moves
+
+
+def _batched_moves(board, color):
+    return [(move & 63, (move >> 6) & 63) for move in get_all_moves(board, color)]
+
+
+def _list_board_divide(generate):
+    """
+    Builds a divide function for a generator working on list-of-lists boards.
+    """
+
+    def perft(board, color, depth):
+        if depth == 0:
+            return 1
+        moves = generate(board, color)
+        if depth == 1:
+            return len(moves)
+        return sum(divide_moves(board, color, depth, moves).values())
+
+    def divide_moves(board, color, depth, moves):
+        other = "b" if color == "w" else "w"
+        counts = {}
+        for from_sq, to_sq in moves:
+            piece = board[from_sq >> 3][from_sq & 7]
+            captured = board[to_sq >> 3][to_sq & 7]
+            board[to_sq >> 3][to_sq & 7] = piece
+            board[from_sq >> 3][from_sq & 7] = " "
+            counts[(from_sq, to_sq)] = perft(board, other, depth - 1)
+            board[from_sq >> 3][from_sq & 7] = piece
+            board[to_sq >> 3][to_sq & 7] = captured
+        return counts
+
+    def divide(board, color, depth):
+        board = [board_row[:] for board_row in board]
+        return divide_moves(board, color, depth, generate(board, color))
+
+    return divide
+
+
+def _bitboard_divide(board, color, depth):
+    position = Bitboards.from_board(board, color == "w")
+    counts = {}
+    for from_sq, to_sq in position.generate_moves():
+        position.make_move(from_sq, to_sq)
+        counts[(from_sq, to_sq)] = position.perft(depth - 1)
+        position.unmake_move()
+    return counts
+
+
+def _mailbox_divide(board, color, depth):
+    position = Position.from_board(board, color == "w")
+    counts = {}
+    for move in position.generate_moves():
+        position.make_move(move)
+        counts[(move & 63, (move >> 6) & 63)] = position.perft(depth - 1)
+        position.unmake_move()
+    return counts
+
+
+def _rescan_moves(position):
+    """
+    Filters the pseudo-legal moves by playing each one and looking for
+    attacks on the mover's king.
+    """
+    white = position.white_to_move
+    enemy_king = PIECE_CODES["k" if white else "K"]
+    legal = []
+    for move in position.generate_moves():
+        if move >> 12 != enemy_king:
+            position.make_move(move)
+            king_sq = position.king_square(white)
+            attacked = king_sq >= 0 and position.is_attacked(king_sq, not white)
+            position.unmake_move()
+            if attacked:
+                continue
+        legal.append(move)
+    return legal
+
+
+def _legal_divide(generate):
+    """
+    Builds a divide function counting the tree of a Position legal move
+    generator.
+    """
+
+    def perft(position, depth):
+        if depth == 0:
+            return 1
+        moves = generate(position)
+        if depth == 1:
+            return len(moves)
+        nodes = 0
+        for move in moves:
+            position.make_move(move)
+            nodes += perft(position, depth - 1)
+            position.unmake_move()
+        return nodes
+
+    def divide(board, color, depth):
+        position = Position.from_board(board, color == "w")
+        counts = {}
+        for move in generate(position):
+            position.make_move(move)
+            counts[(move & 63, (move >> 6) & 63)] = perft(position, depth - 1)
+            position.unmake_move()
+        return counts
+
+    return divide
+
+
+# Each backend maps (board, color, depth) to leaf counts per root move
+BACKENDS = {
+    "reference": _list_board_divide(_reference_moves),
+    "batched": _list_board_divide(_batched_moves),
+    "bitboard": _bitboard_divide,
+    "mailbox": _mailbox_divide,
+}
+
+# The same for the legal move tree, see --legal
+LEGAL_BACKENDS = {
+    "rescan": _legal_divide(_rescan_moves),
+    "legal": _legal_divide(Position.legal_moves),
+}
+
+
+def _divide_mismatches(divide, reference):
+    """
+    Lists the root moves whose counts differ, as {"e2e4": [count, expected]}.
+    """
+    mismatches = {}
+    for from_sq, to_sq in sorted(set(divide) | set(reference)):
+        count = divide.get((from_sq, to_sq))
+        expected = reference.get((from_sq, to_sq))
+        if count != expected:
+            name = square_name(from_sq) + square_name(to_sq)
+            mismatches[name] = [count, expected]
+    return mismatches
+
+
+def run(positions, backends, max_depth, legal=False):
+    """
+    Runs perft to every depth up to max_depth for each position and backend,
+    over the legal move tree with LEGAL_BACKENDS if legal is set.
+
+    Returns:
+        A JSON-serialisable report with one result per position, backend and
+        depth, plus every count that disagrees with the reference backend or
+        the expected values.
+    """
+    all_backends = LEGAL_BACKENDS if legal else BACKENDS
+    all_expected = LEGAL_EXPECTED if legal else EXPECTED
+    results = []
+    errors = []
+    for name in positions:
+        board, color = board_from_fen(POSITIONS[name])
+        for depth in range(1, max_depth + 1):
+            reference = None
+            for backend in backends:
+                start = time.perf_counter()
+                divide = all_backends[backend](board, color, depth)
+                seconds = time.perf_counter() - start
+                nodes = sum(divide.values())
+                results.append(
+                    {
+                        "position": name,
+                        "backend": backend,
+                        "depth": depth,
+                        "nodes": nodes,
+                        "seconds": round(seconds, 6),
+                        "nps": round(nodes / seconds) if seconds else None,
+                    }
+                )
+
+                expected = all_expected[name]
+                if depth <= len(expected) and nodes != expected[depth - 1]:
+                    errors.append(
+                        {
+                            "position": name,
+                            "backend": backend,
+                            "depth": depth,
+                            "nodes": nodes,
+                            "expected": expected[depth - 1],
+                        }
+                    )
+                if reference is None:
+                    reference = divide
+                elif divide != reference:
+                    errors.append(
+                        {
+                            "position": name,
+                            "backend": backend,
+                            "depth": depth,
+                            "against": backends[0],
+                            "moves": _divide_mismatches(divide, reference),
+                        }
+                    )
+
+    speedups = {}
+    for backend in backends[1:]:
+        base = sum(r["seconds"] for r in results if r["backend"] == backends[0])
+        other = sum(r["seconds"] for r in results if r["backend"] == backend)
+        speedups[backend] = round(base / other, 2) if other else None
+    return {
+        "depth": max_depth,
+        "legal": legal,
+        "results": results,
+        "speedup": speedups,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perft benchmark for brain.py")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument(
+        "--positions", nargs="+", choices=POSITIONS, default=list(POSITIONS)
+    )
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        choices=list(BACKENDS) + list(LEGAL_BACKENDS),
+        help="the first backend is the one the others are compared against, "
+        "all of one mode by default",
+    )
+    parser.add_argument(
+        "--legal", action="store_true", help="count the legal move tree instead"
+    )
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    mode_backends = LEGAL_BACKENDS if args.legal else BACKENDS
+    backends = args.backends or list(mode_backends)
+    for backend in backends:
+        if backend not in mode_backends:
+            parser.error(
+                f"backend {backend!r} is not available "
+                f"{'with' if args.legal else 'without'} --legal"
+            )
+
+    report = run(args.positions, backends, args.depth, args.legal)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    sys.exit(1 if report["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+"""
+Mailbox position backend for the search.
+
+A position is a 64-byte bytearray of piece codes, numbered row * 8 + col like
+the list-of-lists boards, with each byte holding the code of the piece on the
+square as listed in brain.PIECES (0 for empty). Moves are played in place and
+taken back from an undo stack, so a search never copies a board. The
+evaluation sums from evaluation.py are kept up to date the same way.
+"""
+
+from array import array
+
+from brain import (
+    BISHOP_RAY_SQUARES,
+    BLACK_PAWN_CAPTURE_SQUARES,
+    BLACK_PAWN_PUSH_SQUARES,
+    KING_SQUARES,
+    KNIGHT_SQUARES,
+    PIECE_CODES,
+    PIECE_SQUARE_TABLES,
+    PIECES,
+    ROOK_RAY_SQUARES,
+    WHITE_PAWN_CAPTURE_SQUARES,
+    WHITE_PAWN_PUSH_SQUARES,
+)
+from evaluation import ENDGAME_SCORES, MIDDLEGAME_SCORES, PHASE_CODES
+from transposition import ZOBRIST, ZOBRIST_BLACK_TO_MOVE
+
+EMPTY = 0
+WHITE_PAWN = PIECE_CODES["P"]
+BLACK_PAWN = PIECE_CODES["p"]
+
+# Per piece code, 1 if the piece belongs to that colour
+WHITE_CODES = bytes(piece.isupper() for piece in PIECES)
+BLACK_CODES = bytes(piece.islower() for piece in PIECES)
+
+# Per piece code, 1 if the piece slides along ranks and files, or diagonals
+ORTHOGONAL_CODES = bytes(piece in "RQrq" for piece in PIECES)
+DIAGONAL_CODES = bytes(piece in "BQbq" for piece in PIECES)
+
+# Per square: every ray leaving it, paired with the codes that slide along it
+SLIDER_RAYS = tuple(
+    tuple((ray, ORTHOGONAL_CODES) for ray in ROOK_RAY_SQUARES[sq])
+    + tuple((ray, DIAGONAL_CODES) for ray in BISHOP_RAY_SQUARES[sq])
+    for sq in range(64)
+)
+
+# Per colour of the attacker: its pawn, knight and king codes, and the squares
+# from which its pawns attack a square
+ATTACKERS = {
+    True: (
+        PIECE_CODES["P"],
+        PIECE_CODES["N"],
+        PIECE_CODES["K"],
+        BLACK_PAWN_CAPTURE_SQUARES,
+    ),
+    False: (
+        PIECE_CODES["p"],
+        PIECE_CODES["n"],
+        PIECE_CODES["k"],
+        WHITE_PAWN_CAPTURE_SQUARES,
+    ),
+}
+
+# Per piece code: the square table to walk and whether its entries are rays,
+# None for empty squares and pawns
+CODE_TABLES = [PIECE_SQUARE_TABLES.get(piece) for piece in PIECES]
+
+# Zobrist keys per piece code and square, all zero for empty squares
+ZOBRIST_CODES = [ZOBRIST[piece] for piece in PIECES]
+
+
+class Position:
+    """
+    A position stored as a bytearray mailbox, the side to move and its
+    Zobrist key, which matches transposition.hash_board.
+
+    middlegame and endgame are white's material plus piece-square sums for
+    each phase, and phase the weight of the pieces left, see evaluation.py.
+    Moves change them by the scores of the squares involved only.
+
+    Every move played is pushed as its packed record, captured piece included,
+    onto an array("H"), and the key before it onto an array("Q"). That is all
+    unmake_move needs to take it back.
+    """
+
+    def __init__(self):
+        self.squares = bytearray(64)
+        self.white_to_move = True
+        self.key = 0
+        self.middlegame = 0
+        self.endgame = 0
+        self.phase = 0
+        self.played = array("H")
+        self.keys = array("Q")
+
+    @classmethod
+    def from_board(cls, board, white_to_move=True):
+        """
+        Builds a position from a list-of-lists board of one-char strings.
+        """
+        position = cls()
+        position.white_to_move = white_to_move
+        key = 0 if white_to_move else ZOBRIST_BLACK_TO_MOVE
+        for row in range(8):
+            for col in range(8):
+                piece = board[row][col]
+                position.squares[row * 8 + col] = PIECE_CODES[piece]
+                key ^= ZOBRIST[piece][row * 8 + col]
+        position.key = key
+        for sq, code in enumerate(position.squares):
+            position.middlegame += MIDDLEGAME_SCORES[code][sq]
+            position.endgame += ENDGAME_SCORES[code][sq]
+            position.phase += PHASE_CODES[code]
+        return position
+
+    def to_board(self):
+        """
+        Converts the position back into a list-of-lists board.
+        """
+        return [
+            [PIECES[code] for code in self.squares[row * 8 : row * 8 + 8]]
+            for row in range(8)
+        ]
+
+    @property
+    def color(self):
+        """
+        The side to move, "w" or "b".
+        """
+        return "w" if self.white_to_move else "b"
+
+    def generate_moves(self):
+        """
+        Generates the pseudo-legal moves of the side to move.
+
+        Returns:
+            An array of packed (from, to, captured) move records, the same
+            format as brain.get_all_moves.
+        """
+        if self.white_to_move:
+            own, enemies, pawn = WHITE_CODES, BLACK_CODES, WHITE_PAWN
+            pushes, captures = WHITE_PAWN_PUSH_SQUARES, WHITE_PAWN_CAPTURE_SQUARES
+        else:
+            own, enemies, pawn = BLACK_CODES, WHITE_CODES, BLACK_PAWN
+            pushes, captures = BLACK_PAWN_PUSH_SQUARES, BLACK_PAWN_CAPTURE_SQUARES
+
+        squares = self.squares
+        tables = CODE_TABLES
+        moves = array("H")
+        append = moves.append
+
+        for sq in range(64):
+            piece = squares[sq]
+            if not own[piece]:
+                continue
+
+            if piece == pawn:
+                for to_sq in pushes[sq]:
+                    if squares[to_sq]:
+                        break
+                    append(sq | to_sq << 6)
+                for to_sq in captures[sq]:
+                    target = squares[to_sq]
+                    if enemies[target]:
+                        append(sq | to_sq << 6 | target << 12)
+                continue
+
+            table, sliding = tables[piece]
+            if sliding:
+                for ray in table[sq]:
+                    for to_sq in ray:
+                        target = squares[to_sq]
+                        if not target:
+                            append(sq | to_sq << 6)
+                        else:
+                            if enemies[target]:
+                                append(sq | to_sq << 6 | target << 12)
+                            break
+            else:
+                for to_sq in table[sq]:
+                    target = squares[to_sq]
+                    if not target:
+                        append(sq | to_sq << 6)
+                    elif enemies[target]:
+                        append(sq | to_sq << 6 | target << 12)
+
+        return moves
+
+    def is_attacked(self, sq, by_white):
+        """
+        Whether any piece of one colour attacks a square.
+        """
+        squares = self.squares
+        pawn, knight, king, pawn_sources = ATTACKERS[by_white]
+        for from_sq in KNIGHT_SQUARES[sq]:
+            if squares[from_sq] == knight:
+                return True
+        for from_sq in pawn_sources[sq]:
+            if squares[from_sq] == pawn:
+                return True
+        for from_sq in KING_SQUARES[sq]:
+            if squares[from_sq] == king:
+                return True
+        own = WHITE_CODES if by_white else BLACK_CODES
+        for ray, sliders in SLIDER_RAYS[sq]:
+            for from_sq in ray:
+                code = squares[from_sq]
+                if code:
+                    if own[code] and sliders[code]:
+                        return True
+                    break
+        return False
+
+    def king_square(self, white):
+        """
+        The square of one side's king, or -1 if it has been captured.
+        """
+        return self.squares.find(PIECE_CODES["K" if white else "k"])
+
+    def in_check(self):
+        """
+        Whether the side to move's king is attacked.
+        """
+        king_sq = self.king_square(self.white_to_move)
+        return king_sq >= 0 and self.is_attacked(king_sq, not self.white_to_move)
+
+    def checks_and_pins(self):
+        """
+        Looks outwards from the side to move's king once for the enemy pieces
+        giving check and the own pieces pinned against it.
+
+        Returns:
+            A (checks, pins) tuple. checks lists one frozenset per checking
+            piece: the squares a non-king move must land on to answer it, the
+            checker's own square and any squares between it and the king.
+            pins maps the square of each pinned piece to the frozenset of
+            squares it may still move to along the pin.
+        """
+        white = self.white_to_move
+        king_sq = self.king_square(white)
+        squares = self.squares
+        own = WHITE_CODES if white else BLACK_CODES
+        pawn, knight, king, pawn_sources = ATTACKERS[not white]
+
+        checks = []
+        for table, code in (
+            (KNIGHT_SQUARES, knight),
+            (pawn_sources, pawn),
+            (KING_SQUARES, king),
+        ):
+            for from_sq in table[king_sq]:
+                if squares[from_sq] == code:
+                    checks.append(frozenset((from_sq,)))
+
+        pins = {}
+        for ray, sliders in SLIDER_RAYS[king_sq]:
+            blocker = -1
+            for sq in ray:
+                code = squares[sq]
+                if not code:
+                    continue
+                if own[code]:
+                    if blocker >= 0:
+                        break  # Two of our own pieces in the way
+                    blocker = sq
+                    continue
+                if sliders[code]:
+                    line = frozenset(ray[: ray.index(sq) + 1])
+                    if blocker < 0:
+                        checks.append(line)
+                    else:
+                        pins[blocker] = line
+                break
+        return checks, pins
+
+    def legal_moves(self):
+        """
+        Generates the moves of the side to move that do not leave its own
+        king attacked.
+
+        Checks and pins are found once, so every move but a king move is
+        filtered with set lookups; king moves are checked for attacks on the
+        target square with the king lifted off the board. Capturing the enemy
+        king ends the game and is always allowed, and a side without a king
+        keeps all its moves.
+
+        Returns:
+            An array of packed move records, like generate_moves.
+        """
+        moves = self.generate_moves()
+        white = self.white_to_move
+        king_sq = self.king_square(white)
+        if king_sq < 0:
+            return moves
+
+        checks, pins = self.checks_and_pins()
+        if len(checks) > 1:
+            answers = frozenset()  # Double check, only the king can move
+        elif checks:
+            answers = checks[0]
+        else:
+            answers = None
+        enemy_king = PIECE_CODES["k" if white else "K"]
+
+        # Most positions have neither, and only king moves need a look
+        if answers is None and not pins:
+            legal = array("H", [move for move in moves if move & 63 != king_sq])
+        else:
+            legal = array("H")
+            for move in moves:
+                from_sq, to_sq = move & 63, (move >> 6) & 63
+                if from_sq == king_sq:
+                    continue
+                if move >> 12 != enemy_king and (
+                    (answers is not None and to_sq not in answers)
+                    or (from_sq in pins and to_sq not in pins[from_sq])
+                ):
+                    continue
+                legal.append(move)
+
+        squares = self.squares
+        king = squares[king_sq]
+        squares[king_sq] = EMPTY
+        for move in moves:
+            if move & 63 == king_sq:
+                if move >> 12 == enemy_king or not self.is_attacked(
+                    (move >> 6) & 63, not white
+                ):
+                    legal.append(move)
+        squares[king_sq] = king
+        return legal
+
+    def make_move(self, move):
+        """
+        Plays a move and pushes what is needed to take it back.
+
+        Args:
+            move: A packed move record. Only its from and to squares are read,
+                the captured piece is taken from the board.
+        """
+        squares = self.squares
+        from_sq, to_sq = move & 63, (move >> 6) & 63
+        piece = squares[from_sq]
+        captured = squares[to_sq]
+        self.played.append(from_sq | to_sq << 6 | captured << 12)
+        self.keys.append(self.key)
+        piece_keys = ZOBRIST_CODES[piece]
+        self.key ^= (
+            piece_keys[from_sq]
+            ^ piece_keys[to_sq]
+            ^ ZOBRIST_CODES[captured][to_sq]
+            ^ ZOBRIST_BLACK_TO_MOVE
+        )
+        middlegame, endgame = MIDDLEGAME_SCORES[piece], ENDGAME_SCORES[piece]
+        self.middlegame += (
+            middlegame[to_sq] - middlegame[from_sq] - MIDDLEGAME_SCORES[captured][to_sq]
+        )
+        self.endgame += (
+            endgame[to_sq] - endgame[from_sq] - ENDGAME_SCORES[captured][to_sq]
+        )
+        self.phase -= PHASE_CODES[captured]
+        squares[to_sq] = piece
+        squares[from_sq] = EMPTY
+        self.white_to_move = not self.white_to_move
+
+    def unmake_move(self):
+        """
+        Takes back the last move played with make_move.
+        """
+        move = self.played.pop()
+        squares = self.squares
+        from_sq, to_sq = move & 63, (move >> 6) & 63
+        piece, captured = squares[to_sq], move >> 12
+        squares[from_sq] = piece
+        squares[to_sq] = captured
+        middlegame, endgame = MIDDLEGAME_SCORES[piece], ENDGAME_SCORES[piece]
+        self.middlegame += (
+            middlegame[from_sq] - middlegame[to_sq] + MIDDLEGAME_SCORES[captured][to_sq]
+        )
+        self.endgame += (
+            endgame[from_sq] - endgame[to_sq] + ENDGAME_SCORES[captured][to_sq]
+        )
+        self.phase += PHASE_CODES[captured]
+        self.key = self.keys.pop()
+        self.white_to_move = not self.white_to_move
+
+    def perft(self, depth):
+        """
+        Counts the leaf nodes of the pseudo-legal move tree to a given depth.
+        """
+        if depth == 0:
+            return 1
+        moves = self.generate_moves()
+        if depth == 1:
+            return len(moves)
+        nodes = 0
+        for move in moves:
+            self.make_move(move)
+            nodes += self.perft(depth - 1)
+            self.unmake_move()
+        return nodes
@@ -0,0 +1,209 @@
+"""
+Board rendering shared by the pygame front-ends.
+
+The checkerboard is drawn once into a background surface. Each frame only the
+squares whose piece or highlight changed since the last frame are repainted,
+and only their rects are pushed to the display. Banner text is an overlay
+drawn by the same frames and expires on its own, so showing it never stalls
+the event loop.
+"""
+
+import pygame
+
+TEXT_COLOR = (0, 0, 0)
+FONT_NAME = "Arial"
+
+_fonts = {}  # Keyed by size
+_labels = {}  # Keyed by (message, size)
+
+
+def render_label(message, size=50):
+    """
+    Renders a line of text once and returns the cached surface afterwards.
+    """
+    key = (message, size)
+    label = _labels.get(key)
+    if label is None:
+        font = _fonts.get(size)
+        if font is None:
+            font = _fonts[size] = pygame.font.SysFont(FONT_NAME, size)
+        label = _labels[key] = font.render(message, True, TEXT_COLOR)
+    return label
+
+
+class BoardRenderer:
+    """
+    Draws a list-of-lists board onto the screen using dirty rectangles.
+
+    Args:
+        screen: The display surface.
+        piece_images: Images keyed like "w_k" or "b_p", already scaled to a
+            square.
+        square_size: Side of a square in pixels.
+        colors: Colours of the light and dark squares.
+        highlight_color: Colour painted over highlighted squares.
+    """
+
+    def __init__(
+        self, screen, piece_images, square_size, colors, highlight_color=(0, 255, 0)
+    ):
+        self.screen = screen
+        self.square_size = square_size
+        self.highlight_color = highlight_color
+
+        self.background = pygame.Surface(screen.get_size())
+        for row in range(8):
+            for col in range(8):
+                self.background.fill(
+                    colors[(row + col) % 2], self.square_rect(row, col)
+                )
+
+        # Keyed by the board letter, so drawing a square needs no string building
+        self.images = {}
+        for key, image in piece_images.items():
+            color, piece = key.split("_")
+            self.images[piece.upper() if color == "w" else piece] = image
+
+        self.drawn = None  # Board as last drawn, None forces a full redraw
+        self.drawn_highlights = frozenset()
+        self.dirty_squares = set()
+
+        # The banner on screen as (expiry in pygame ticks, surface, rect)
+        self.overlay = None
+        self.overlay_drawn = False
+
+    def square_rect(self, row, col):
+        size = self.square_size
+        return pygame.Rect(col * size, row * size, size, size)
+
+    def invalidate(self, rect=None):
+        """
+        Marks the squares under a screen rect for repainting on the next frame,
+        e.g. after drawing text over the board. Without a rect, repaints all.
+        """
+        if rect is None:
+            self.drawn = None
+            return
+        size = self.square_size
+        rows = range(max(rect.top // size, 0), min((rect.bottom - 1) // size, 7) + 1)
+        cols = range(max(rect.left // size, 0), min((rect.right - 1) // size, 7) + 1)
+        for row in rows:
+            for col in cols:
+                self.dirty_squares.add((row, col))
+
+    def show_text(self, message, duration, size=50):
+        """
+        Shows a banner in the middle of the board, replacing any other.
+
+        Args:
+            message: The text to show.
+            duration: Seconds until the banner removes itself.
+            size: Font size.
+        """
+        if self.overlay is not None:
+            self.invalidate(self.overlay[2])
+        label = render_label(message, size)
+        rect = label.get_rect(center=self.screen.get_rect().center)
+        expires = pygame.time.get_ticks() + int(duration * 1000)
+        self.overlay = (expires, label, rect)
+        self.overlay_drawn = False
+
+    def showing_text(self):
+        """
+        Whether a banner is up and has not expired yet.
+        """
+        return self.overlay is not None and pygame.time.get_ticks() < self.overlay[0]
+
+    def timeout(self):
+        """
+        Milliseconds until the banner expires, for wait_for_events, or 0 if
+        there is no banner and the loop can sleep until the next event.
+        """
+        if self.overlay is None:
+            return 0
+        return max(self.overlay[0] - pygame.time.get_ticks(), 1)
+
+    def render(self, board, highlights=()):
+        """
+        Repaints the squares that changed, draws or clears the banner and
+        updates only their rects.
+
+        Args:
+            board: A 2D list representing the chessboard.
+            highlights: (row, col) squares to paint over, e.g. possible moves.
+
+        Returns:
+            The list of rects that were updated.
+        """
+        highlights = frozenset(highlights)
+        overlay = self.overlay
+        if overlay is not None and pygame.time.get_ticks() >= overlay[0]:
+            self.invalidate(overlay[2])
+            overlay = self.overlay = None
+
+        if self.drawn is None:
+            squares = {(row, col) for row in range(8) for col in range(8)}
+        else:
+            drawn = self.drawn
+            squares = {
+                (row, col)
+                for row in range(8)
+                for col in range(8)
+                if board[row][col] != drawn[row][col]
+            }
+            squares |= highlights ^ self.drawn_highlights
+            squares |= self.dirty_squares
+        if not squares and (overlay is None or self.overlay_drawn):
+            return []
+
+        rects = []
+        for row, col in squares:
+            rect = self.square_rect(row, col)
+            self.screen.blit(self.background, rect, rect)
+            piece = board[row][col]
+            if piece != " ":
+                self.screen.blit(self.images[piece], rect)
+            if (row, col) in highlights:
+                self.screen.fill(self.highlight_color, rect)
+            rects.append(rect)
+
+        # Repainted squares may have covered part of the banner
+        if overlay is not None and (
+            not self.overlay_drawn or overlay[2].collidelist(rects) != -1
+        ):
+            self.screen.blit(overlay[1], overlay[2])
+            rects.append(overlay[2])
+            self.overlay_drawn = True
+
+        self.drawn = [board_row[:] for board_row in board]
+        self.drawn_highlights = highlights
+        self.dirty_squares = set()
+        pygame.display.update(rects)
+        return rects
+
+
+# The only events the front-ends react to; anything else, e.g. mouse motion,
+# is dropped so it cannot wake an idle loop
+LOOP_EVENTS = (
+    pygame.QUIT,
+    pygame.MOUSEBUTTONDOWN,
+    pygame.VIDEOEXPOSE,
+    pygame.WINDOWEXPOSED,
+)
+
+
+def wait_for_events(timeout=0):
+    """
+    Sleeps until at least one event arrives, then returns everything queued.
+
+    Args:
+        timeout: Milliseconds to wait at most, 0 waits for as long as it takes.
+
+    Returns:
+        The list of events, empty if the timeout passed first.
+    """
+    event = pygame.event.wait(timeout)
+    events = pygame.event.get()
+    if event.type != pygame.NOEVENT:
+        events.insert(0, event)
+    return events
@@ -0,0 +1,248 @@
+"""
+Alpha-beta search on the mailbox Position from position.py.
+
+The search plays by the same rules as the front-ends: moves are pseudo-legal
+and a game is decided by capturing the king.
+"""
+
+import time
+
+from brain import PIECE_CODES
+from evaluation import tapered
+from ordering import MoveOrderer
+from position import Position
+from transposition import EXACT, LOWER_BOUND, UPPER_BOUND, TranspositionTable
+
+MATE_SCORE = 100000
+INFINITY = MATE_SCORE + 1
+# Scores beyond this are king captures, stored relative to the node in the table
+MATE_BOUND = MATE_SCORE - 1000
+
+KING_CODES = {"w": PIECE_CODES["k"], "b": PIECE_CODES["K"]}
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside the search when the time or node budget runs out.
+    """
+
+
+def evaluate(position):
+    """
+    Scores a position from the point of view of the side to move in
+    centipawns, from the evaluation sums it keeps up to date.
+    """
+    score = tapered(position.middlegame, position.endgame, position.phase)
+    return score if position.white_to_move else -score
+
+
+class Searcher:
+    """
+    Negamax alpha-beta search with iterative deepening under a per-move budget.
+
+    Args:
+        time_limit: Wall-clock seconds allowed per search, or None.
+        node_limit: Nodes allowed per search, or None.
+        max_depth: Deepest iteration to start.
+        tt_size_mb: Memory cap of the transposition table, which is kept
+            between searches.
+        stop_event: A threading or multiprocessing Event that cuts the search
+            short when set, as if the budget had run out, or None.
+    """
+
+    def __init__(
+        self,
+        time_limit=1.0,
+        node_limit=None,
+        max_depth=64,
+        tt_size_mb=16,
+        stop_event=None,
+    ):
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.stop_event = stop_event
+        self.max_depth = max_depth
+        self.table = TranspositionTable(tt_size_mb)
+        self.orderer = MoveOrderer()
+        self.deadline = None
+        self.nodes = 0
+        self.depth = 0
+        self.best_score = 0
+
+    def search(self, board, color, root_moves=None, fallback=None):
+        """
+        Finds the best move for one colour within the budget.
+
+        Args:
+            board: A 2D list representing the chessboard. It is not modified.
+            color: "w" for white or "b" for black.
+            root_moves: Packed move records to choose from, as returned by
+                brain.get_all_moves. Generated when not given.
+            fallback: Packed move record to play if not even the first
+                iteration finishes. Defaults to the first root move.
+
+        Returns:
+            The best packed move record found, or None if there are no moves.
+        """
+        # A timeout leaves moves played on the position, so it is built anew
+        # for every search
+        position = Position.from_board(board, color == "w")
+        if root_moves is None:
+            root_moves = position.generate_moves()
+        root_moves = list(root_moves)
+        if not root_moves:
+            return None
+
+        self.nodes = 0
+        self.depth = 0
+        self.best_score = 0
+        self.deadline = (
+            None if self.time_limit is None else time.perf_counter() + self.time_limit
+        )
+
+        king = KING_CODES[color]
+        for move in root_moves:
+            if move >> 12 == king:
+                return move
+
+        best_move = fallback if fallback in root_moves else root_moves[0]
+        self.orderer.new_search()
+        root_moves = self.orderer.order(position.squares, root_moves, 0)
+
+        for depth in range(1, self.max_depth + 1):
+            # Search the previous best move first so a partial iteration
+            # can only replace it with a move that scores better
+            root_moves.remove(best_move)
+            root_moves.insert(0, best_move)
+            alpha = -INFINITY
+            try:
+                for move in root_moves:
+                    score = -self._search_move(
+                        position, move, depth, alpha, INFINITY, 1
+                    )
+                    if score > alpha:
+                        alpha = score
+                        best_move = move
+                        self.best_score = score
+            except SearchTimeout:
+                break
+            self.depth = depth
+            if abs(alpha) >= MATE_SCORE - self.max_depth:
+                break  # Forced king capture either way, no need to look deeper
+
+        return best_move
+
+    def _check_budget(self):
+        """
+        Raises SearchTimeout once the budget is spent or the search is stopped.
+        Called every 64 nodes.
+        """
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SearchTimeout
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise SearchTimeout
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchTimeout
+
+    def _search_move(self, position, move, depth, alpha, beta, ply):
+        """
+        Plays a move, searches the reply from the opponent's point of view and
+        takes the move back. Returns the opponent's score.
+        """
+        position.make_move(move)
+        score = self._negamax(position, depth - 1, -beta, -alpha, ply)
+        position.unmake_move()
+        return score
+
+    def _negamax(self, position, depth, alpha, beta, ply):
+        self.nodes += 1
+        if not self.nodes & 63:
+            self._check_budget()
+
+        if depth <= 0:
+            return self._quiesce(position, alpha, beta, ply)
+
+        key = position.key
+        tt_move = 0
+        entry = self.table.probe(key)
+        if entry is not None:
+            entry_depth, flag, score, tt_move = entry
+            if entry_depth >= depth:
+                if score > MATE_BOUND:
+                    score -= ply
+                elif score < -MATE_BOUND:
+                    score += ply
+                if (
+                    flag == EXACT
+                    or (flag == LOWER_BOUND and score >= beta)
+                    or (flag == UPPER_BOUND and score <= alpha)
+                ):
+                    return score
+
+        moves = position.generate_moves()
+        if not moves:
+            return 0
+        king = KING_CODES[position.color]
+        for move in moves:
+            if move >> 12 == king:
+                return MATE_SCORE - ply
+
+        moves = self.orderer.order(position.squares, moves, ply, tt_move)
+
+        original_alpha = alpha
+        best = -INFINITY
+        best_move = 0
+        for move in moves:
+            score = -self._search_move(position, move, depth, alpha, beta, ply + 1)
+            if score > best:
+                best = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        self.orderer.record_cutoff(move, depth, ply)
+                        break
+
+        if best <= original_alpha:
+            flag = UPPER_BOUND
+        elif best >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        stored = best
+        if stored > MATE_BOUND:
+            stored += ply
+        elif stored < -MATE_BOUND:
+            stored -= ply
+        self.table.store(key, depth, flag, stored, best_move)
+        return best
+
+    def _quiesce(self, position, alpha, beta, ply):
+        """
+        Searches captures only until the position is quiet.
+        """
+        stand_pat = evaluate(position)
+        if stand_pat >= beta:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        king = KING_CODES[position.color]
+        captures = [move for move in position.generate_moves() if move >> 12]
+        for move in captures:
+            if move >> 12 == king:
+                return MATE_SCORE - ply
+        captures = self.orderer.order_captures(position.squares, captures)
+
+        for move in captures:
+            self.nodes += 1
+            if not self.nodes & 63:
+                self._check_budget()
+            position.make_move(move)
+            score = -self._quiesce(position, -beta, -alpha, ply + 1)
+            position.unmake_move()
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
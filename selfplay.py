@@ -0,0 +1,197 @@
+"""
+Headless bot-vs-bot games: no window, no banners and no frame flips.
+
+A bot is anything with a move(board, is_white) method that plays one move on
+the list-of-lists board and returns the board, or None when it has no move.
+Bots that search may also expose the nodes searched for their last move as a
+nodes attribute.
+"""
+
+import logging
+import random
+import time
+
+from brain import get_all_moves, move_from, move_to, square_name
+from search import Searcher
+
+log = logging.getLogger(__name__)
+
+START_BOARD = [
+    ["r", "n", "b", "q", "k", "b", "n", "r"],
+    ["p", "p", "p", "p", "p", "p", "p", "p"],
+    [" ", " ", " ", " ", " ", " ", " ", " "],
+    [" ", " ", " ", " ", " ", " ", " ", " "],
+    [" ", " ", " ", " ", " ", " ", " ", " "],
+    [" ", " ", " ", " ", " ", " ", " ", " "],
+    ["P", "P", "P", "P", "P", "P", "P", "P"],
+    ["R", "N", "B", "Q", "K", "B", "N", "R"],
+]
+
+# Opening lines played from the standard position, as move lists
+OPENINGS = {
+    "start": [],
+    "e4e5": ["e2e4", "e7e5"],
+    "d4d5": ["d2d4", "d7d5"],
+    "c4e5": ["c2c4", "e7e5"],
+    "nf3d5": ["g1f3", "d7d5"],
+    "e4c5": ["e2e4", "c7c5"],
+}
+
+
+class RandomBot:
+    """
+    Plays a uniformly random move from the generated move list.
+    """
+
+    def __init__(self, verbose=True):
+        self.verbose = verbose
+
+    def move(self, board, is_white):
+        """
+        Plays a uniformly random move for one side.
+
+        Returns:
+            The board, or None if the side to move has no moves (stalemate).
+        """
+        moves = get_all_moves(board, "w" if is_white else "b")
+        if not moves:
+            return None
+
+        move = random.choice(moves)
+        start_x, start_y = divmod(move_from(move), 8)
+        end_x, end_y = divmod(move_to(move), 8)
+        piece = board[start_x][start_y]
+        if self.verbose:
+            log.debug(
+                "Moving %s from %s to %s", piece, (start_x, start_y), (end_x, end_y)
+            )
+        board[start_x][start_y] = " "
+        board[end_x][end_y] = piece
+        return board
+
+
+class SearchBot:
+    """
+    Plays the best move found by an alpha-beta search within a time budget.
+    """
+
+    def __init__(self, time_limit=0.1, node_limit=None):
+        self.searcher = Searcher(time_limit=time_limit, node_limit=node_limit)
+        self.nodes = 0
+
+    def move(self, board, is_white):
+        move = self.searcher.search(board, "w" if is_white else "b")
+        self.nodes = self.searcher.nodes
+        if move is None:
+            return None
+        start_x, start_y = divmod(move_from(move), 8)
+        end_x, end_y = divmod(move_to(move), 8)
+        board[end_x][end_y] = board[start_x][start_y]
+        board[start_x][start_y] = " "
+        return board
+
+
+# Engines by name, for command-line pairings such as "search:0.05"
+ENGINES = {"random": RandomBot, "search": SearchBot}
+
+
+def create_engine(spec):
+    """
+    Builds a bot from "name" or "name:time_limit", e.g. "search:0.05".
+    """
+    name, _, time_limit = spec.partition(":")
+    if name == "random":
+        return RandomBot(verbose=False)
+    if time_limit:
+        return ENGINES[name](time_limit=float(time_limit))
+    return ENGINES[name]()
+
+
+def board_after(moves, board=None):
+    """
+    Plays a list of moves such as ["e2e4", "e7e5"] on a copy of a board.
+    """
+    board = [board_row[:] for board_row in (board or START_BOARD)]
+    for move in moves:
+        start_y, start_x = "abcdefgh".index(move[0]), 8 - int(move[1])
+        end_y, end_x = "abcdefgh".index(move[2]), 8 - int(move[3])
+        board[end_x][end_y] = board[start_x][start_y]
+        board[start_x][start_y] = " "
+    return board
+
+
+def _find_move(before, after):
+    """
+    Works out which move turned one board into the other.
+
+    Returns:
+        A (from_sq, to_sq) tuple, or None if the boards are the same.
+    """
+    from_sq = to_sq = None
+    for row in range(8):
+        for col in range(8):
+            if before[row][col] != after[row][col]:
+                if after[row][col] == " ":
+                    from_sq = row * 8 + col
+                else:
+                    to_sq = row * 8 + col
+    if from_sq is None or to_sq is None:
+        return None
+    return from_sq, to_sq
+
+
+def play_game(white, black, board=None, max_plies=200, is_white=True):
+    """
+    Plays one game between two bots until a king is captured, a bot has no
+    move (stalemate) or the ply limit is reached.
+
+    Args:
+        white: The bot playing white.
+        black: The bot playing black.
+        board: The starting board, the standard position if None.
+        max_plies: Half-moves to play before the game is called a draw.
+        is_white: Whether white moves first from the starting board.
+
+    Returns:
+        A dict with the result ("1-0", "0-1" or "1/2-1/2"), the reason the game
+        ended, the number of plies, the moves as e.g. "e2e4", the seconds the
+        game took and, per colour, the moves played, seconds spent in
+        bot.move and nodes searched.
+    """
+    board = [board_row[:] for board_row in (board or START_BOARD)]
+    moves = []
+    result, reason = "1/2-1/2", "move limit"
+    stats = {color: {"moves": 0, "seconds": 0.0, "nodes": 0} for color in "wb"}
+    start = time.perf_counter()
+
+    while len(moves) < max_plies:
+        bot = white if is_white else black
+        side = stats["w" if is_white else "b"]
+        before = [board_row[:] for board_row in board]
+        move_start = time.perf_counter()
+        board = bot.move(board, is_white)
+        side["seconds"] += time.perf_counter() - move_start
+        side["nodes"] += getattr(bot, "nodes", 0)
+        if board is None:
+            reason = "stalemate"
+            break
+        move = _find_move(before, board)
+        if move is None:
+            reason = "no move"
+            break
+        moves.append(square_name(move[0]) + square_name(move[1]))
+        side["moves"] += 1
+
+        if before[move[1] >> 3][move[1] & 7] in ("k", "K"):
+            result, reason = ("1-0" if is_white else "0-1"), "king captured"
+            break
+        is_white = not is_white
+
+    return {
+        "result": result,
+        "reason": reason,
+        "plies": len(moves),
+        "moves": moves,
+        "seconds": round(time.perf_counter() - start, 6),
+        "stats": stats,
+    }
@@ -0,0 +1,451 @@
+"""
+Endgame tablebases for small material sets, built by retrograde analysis
+under the front-ends' rules: pseudo-legal moves, no promotion, and a game is
+won by capturing the king. A side with no moves at all is a draw.
+
+A material set is named by white's pieces and then black's, each starting
+with the king, e.g. "KQK", "KPK" or "KQKR". Tables are generated for one
+colour assignment; probes for the colour-swapped set flip the board.
+
+A table file holds one entry per index
+
+    index = (((side * 64 + sq_1) * 64 + sq_2) * 64 + ...) + sq_n
+
+where side is 0 with white to move and the squares are those of the pieces in
+name order. The file has two sections: win/draw/loss from the point of view
+of the side to move, packed four 2-bit entries to a byte, then one byte per
+entry with the plies left until the king is captured (0 for draws). Probes
+read the file through mmap, so nothing is loaded up front and processes
+share one page-cached copy.
+
+Sets of three pieces take about five seconds each to generate. A four-piece
+set has 33.5M positions. KQKR takes about 15 minutes and peaks at about
+220 MB, most of it the three per-position bytearrays. Five-piece sets are out
+of reach in pure Python.
+
+Example:
+    python tablebase.py KQK KRK KPK --directory tablebases
+"""
+
+import argparse
+import itertools
+from array import array
+import mmap
+import os
+
+from brain import (
+    BLACK_PAWN_CAPTURE_SQUARES,
+    BLACK_PAWN_PUSH_SQUARES,
+    PIECE_CODES,
+    PIECE_SQUARE_TABLES,
+    PIECES,
+    WHITE_PAWN_CAPTURE_SQUARES,
+    WHITE_PAWN_PUSH_SQUARES,
+    get_all_moves,
+    move_captured,
+    move_from,
+    move_to,
+)
+
+# Win/draw/loss values, from the point of view of the side to move
+DRAW, WIN, LOSS, INVALID = range(4)
+
+# Order of the pieces of each colour in a material set name
+PIECE_ORDER = "KQRBNP"
+
+DTM_LIMIT = 255
+
+WHITE_PAWN = PIECE_CODES["P"]
+BLACK_PAWN = PIECE_CODES["p"]
+
+
+def _build_unpush_table(pushes):
+    """
+    Inverts a pawn push table: per square, the (from_sq, between) pairs a
+    pawn can have advanced from, where between must be empty, or -1.
+    """
+    table = [[] for _ in range(64)]
+    for from_sq in range(64):
+        for index, to_sq in enumerate(pushes[from_sq]):
+            between = pushes[from_sq][0] if index else -1
+            table[to_sq].append((from_sq, between))
+    return tuple(map(tuple, table))
+
+
+WHITE_PAWN_UNPUSHES = _build_unpush_table(WHITE_PAWN_PUSH_SQUARES)
+BLACK_PAWN_UNPUSHES = _build_unpush_table(BLACK_PAWN_PUSH_SQUARES)
+
+
+def material_name(letters):
+    """
+    Names the material set of a list of piece letters, e.g. ["k", "Q", "K"]
+    gives "KQK".
+    """
+    white = sorted((p for p in letters if p.isupper()), key=PIECE_ORDER.index)
+    black = sorted((p.upper() for p in letters if p.islower()), key=PIECE_ORDER.index)
+    return "".join(white) + "".join(black)
+
+
+def mirror_name(name):
+    """
+    Names the same material with the colours swapped, e.g. "KQK" gives "KKQ".
+    """
+    return material_name([piece.swapcase() for piece in _letters(name)])
+
+
+def _letters(name):
+    """
+    Splits a material set name into piece letters in index order. Without a
+    second king every letter is taken as white's.
+    """
+    split = name.find("K", 1)
+    if split < 0:
+        split = len(name)
+    return list(name[:split]) + list(name[split:].lower())
+
+
+def _sort_placed(placed):
+    """
+    Orders (letter, sq) pairs like the letters of their material set name.
+    """
+    return sorted(
+        placed, key=lambda item: (item[0].islower(), PIECE_ORDER.index(item[0].upper()))
+    )
+
+
+class Tablebase:
+    """
+    Read-only access to the tables in a directory.
+
+    Args:
+        directory: Where the table files are, named like "KQK.tb".
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.tables = {}  # Name to (mmap, entries), or None if absent
+
+    def _table(self, name):
+        if name not in self.tables:
+            path = os.path.join(self.directory, f"{name}.tb")
+            if os.path.exists(path):
+                with open(path, "rb") as table:
+                    data = mmap.mmap(table.fileno(), 0, access=mmap.ACCESS_READ)
+                self.tables[name] = (data, 2 * 64 ** len(name))
+            else:
+                self.tables[name] = None
+        return self.tables[name]
+
+    def has(self, name):
+        """
+        Whether a material set can be probed, in either colour assignment.
+        """
+        return bool(self._table(name) or self._table(mirror_name(name)))
+
+    def probe_placed(self, placed, white_to_move):
+        """
+        Looks up a position given as (letter, sq) pairs.
+
+        Returns:
+            A (wdl, dtm) tuple from the point of view of the side to move, or
+            None if the material set is not available or a king is missing.
+        """
+        letters = [letter for letter, _ in placed]
+        # A captured king has ended the game, there is nothing to look up
+        if letters.count("K") != 1 or letters.count("k") != 1:
+            return None
+        name = material_name(letters)
+        table = self._table(name)
+        if table is None:
+            table = self._table(mirror_name(name))
+            if table is None:
+                return None
+            placed = [(letter.swapcase(), sq ^ 56) for letter, sq in placed]
+            white_to_move = not white_to_move
+
+        data, entries = table
+        index = 0 if white_to_move else 1
+        for _, sq in _sort_placed(placed):
+            index = index * 64 + sq
+        wdl = data[index >> 2] >> ((index & 3) << 1) & 3
+        return wdl, data[(entries + 3) // 4 + index]
+
+    def probe(self, board, color):
+        """
+        Looks up a list-of-lists board with "w" or "b" to move.
+
+        Returns:
+            A (wdl, dtm) tuple from the point of view of the side to move, or
+            None if the material set is not available or a king is missing.
+        """
+        placed = [
+            (board[row][col], row * 8 + col)
+            for row in range(8)
+            for col in range(8)
+            if board[row][col] != " "
+        ]
+        return self.probe_placed(placed, color == "w")
+
+    def best_move(self, board, color):
+        """
+        Picks the move that wins fastest, holds the draw, or loses slowest.
+
+        Returns:
+            A packed move record, or None if the position is not covered.
+        """
+        if self.probe(board, color) is None:
+            return None
+        placed = {
+            row * 8 + col: board[row][col]
+            for row in range(8)
+            for col in range(8)
+            if board[row][col] != " "
+        }
+        best_move, best_rank = None, None
+        for move in get_all_moves(board, color):
+            if move_captured(move) in ("K", "k"):
+                return move
+            after = dict(placed)
+            after[move_to(move)] = after.pop(move_from(move))
+            child = self.probe_placed(
+                [(letter, sq) for sq, letter in after.items()], color != "w"
+            )
+            # Ranked from the mover's point of view, lower is better
+            if child is None:
+                rank = (1, 1)  # Material we have no table for
+            elif child[0] == LOSS:
+                rank = (0, child[1])
+            elif child[0] == WIN:
+                rank = (2, -child[1])
+            else:
+                rank = (1, 0)
+            if best_rank is None or rank < best_rank:
+                best_move, best_rank = move, rank
+        return best_move
+
+    def close(self):
+        for table in self.tables.values():
+            if table is not None:
+                table[0].close()
+        self.tables = {}
+
+
+def _targets(squares, code, sq, own):
+    """
+    Lists the squares a piece can move to, captures included.
+    """
+    targets = []
+    if code == WHITE_PAWN or code == BLACK_PAWN:
+        if code == WHITE_PAWN:
+            pushes, captures = WHITE_PAWN_PUSH_SQUARES, WHITE_PAWN_CAPTURE_SQUARES
+        else:
+            pushes, captures = BLACK_PAWN_PUSH_SQUARES, BLACK_PAWN_CAPTURE_SQUARES
+        for to_sq in pushes[sq]:
+            if squares[to_sq]:
+                break
+            targets.append(to_sq)
+        for to_sq in captures[sq]:
+            target = squares[to_sq]
+            if target and not own[target]:
+                targets.append(to_sq)
+        return targets
+
+    table, sliding = PIECE_SQUARE_TABLES[PIECES[code]]
+    if sliding:
+        for ray in table[sq]:
+            for to_sq in ray:
+                target = squares[to_sq]
+                if not target:
+                    targets.append(to_sq)
+                else:
+                    if not own[target]:
+                        targets.append(to_sq)
+                    break
+    else:
+        for to_sq in table[sq]:
+            target = squares[to_sq]
+            if not target or not own[target]:
+                targets.append(to_sq)
+    return targets
+
+
+def _origins(squares, code, sq):
+    """
+    Lists the empty squares a piece can have moved to sq from without
+    capturing.
+    """
+    if code == WHITE_PAWN or code == BLACK_PAWN:
+        unpushes = WHITE_PAWN_UNPUSHES if code == WHITE_PAWN else BLACK_PAWN_UNPUSHES
+        return [
+            from_sq
+            for from_sq, between in unpushes[sq]
+            if not squares[from_sq] and (between < 0 or not squares[between])
+        ]
+
+    origins = []
+    table, sliding = PIECE_SQUARE_TABLES[PIECES[code]]
+    if sliding:
+        for ray in table[sq]:
+            for from_sq in ray:
+                if squares[from_sq]:
+                    break
+                origins.append(from_sq)
+    else:
+        origins = [from_sq for from_sq in table[sq] if not squares[from_sq]]
+    return origins
+
+
+def generate(name, directory, log=print):
+    """
+    Generates the table of a material set, and first those of every set a
+    capture can lead to, unless they are in the directory already.
+
+    Args:
+        name: The material set, e.g. "KQK".
+        directory: Where to write the table files.
+        log: Called with a line of progress text.
+    """
+    letters = _letters(name)
+    if letters.count("K") != 1 or letters.count("k") != 1:
+        raise ValueError(f"{name!r} needs exactly one king per side")
+    if material_name(letters) != name:
+        raise ValueError(f"{name!r} should be written {material_name(letters)!r}")
+    os.makedirs(directory, exist_ok=True)
+    for index, letter in enumerate(letters):
+        if letter not in ("K", "k"):
+            smaller = material_name(letters[:index] + letters[index + 1 :])
+            if not Tablebase(directory).has(smaller):
+                generate(smaller, directory, log)
+    tables = Tablebase(directory)
+
+    count = len(letters)
+    codes = [PIECE_CODES[letter] for letter in letters]
+    is_white = [letter.isupper() for letter in letters]
+    white_codes = bytes(piece.isupper() for piece in PIECES)
+    black_codes = bytes(piece.islower() for piece in PIECES)
+    enemy_kings = (PIECE_CODES["k"], PIECE_CODES["K"])  # By side, white first
+    side_size = 64**count
+    weights = [64 ** (count - 1 - index) for index in range(count)]
+    entries = 2 * side_size
+
+    wdl = bytearray(entries)
+    dtm = bytearray(entries)
+    remaining = bytearray(entries)
+    # Plies to king capture to the positions resolved at it. Arrays rather than
+    # lists, as a four-piece set resolves tens of millions of positions.
+    frontier = {}
+    # Same, for positions learning of a capture into a smaller set, stored as
+    # position << 1 | whether the capture leaves the opponent lost
+    events = {}
+
+    # Count every position's moves, settle the ones that capture the king and
+    # note the outcome of captures into the smaller sets
+    squares = bytearray(64)
+    for side in (0, 1):
+        white = side == 0
+        own = white_codes if white else black_codes
+        for offset, placement in enumerate(itertools.product(range(64), repeat=count)):
+            position = side * side_size + offset
+            if len(set(placement)) < count:
+                wdl[position] = INVALID
+                continue
+            for code, sq in zip(codes, placement):
+                squares[sq] = code
+            moves = 0
+            for piece, (code, sq) in enumerate(zip(codes, placement)):
+                if is_white[piece] != white:
+                    continue
+                for to_sq in _targets(squares, code, sq, own):
+                    target = squares[to_sq]
+                    if target == enemy_kings[side]:
+                        wdl[position] = WIN
+                        dtm[position] = 1
+                        frontier.setdefault(1, array("I")).append(position)
+                        break
+                    moves += 1
+                    if target:
+                        placed = [
+                            (letters[other], to_sq if other == piece else other_sq)
+                            for other, other_sq in enumerate(placement)
+                            if other_sq != to_sq
+                        ]
+                        child = tables.probe_placed(placed, not white)
+                        if child[0] in (WIN, LOSS):
+                            events.setdefault(child[1], array("Q")).append(
+                                position << 1 | (child[0] == LOSS)
+                            )
+                else:
+                    continue
+                break
+            remaining[position] = moves
+            for sq in placement:
+                squares[sq] = 0
+    log(f"{name}: counted moves of {entries} positions")
+
+    def resolve(position, child_lost, plies):
+        if wdl[position] != DRAW:
+            return
+        if child_lost:
+            wdl[position] = WIN
+        else:
+            remaining[position] -= 1
+            if remaining[position]:
+                return
+            wdl[position] = LOSS
+        dtm[position] = min(plies + 1, DTM_LIMIT)
+        frontier.setdefault(plies + 1, array("I")).append(position)
+
+    # Work backwards from the settled positions one ply at a time, so wins
+    # get the shortest distance and losses the longest
+    plies = 1
+    while frontier or events:
+        for event in events.pop(plies, ()):
+            resolve(event >> 1, event & 1, plies)
+        for position in frontier.pop(plies, ()):
+            child_lost = wdl[position] == LOSS
+            side, offset = divmod(position, side_size)
+            placement = []
+            for weight in weights:
+                sq, offset = divmod(offset, weight)
+                placement.append(sq)
+            for code, sq in zip(codes, placement):
+                squares[sq] = code
+            # The side that just moved is the one not to move here
+            mover_white = side == 1
+            parent_side = (1 - 2 * side) * side_size
+            for piece, (code, sq) in enumerate(zip(codes, placement)):
+                if is_white[piece] != mover_white:
+                    continue
+                for from_sq in _origins(squares, code, sq):
+                    resolve(
+                        position + parent_side + (from_sq - sq) * weights[piece],
+                        child_lost,
+                        plies,
+                    )
+            for sq in placement:
+                squares[sq] = 0
+        plies += 1
+
+    packed = bytearray((entries + 3) // 4)
+    for position in range(entries):
+        packed[position >> 2] |= wdl[position] << ((position & 3) << 1)
+    with open(os.path.join(directory, f"{name}.tb"), "wb") as table:
+        table.write(packed)
+        table.write(dtm)
+    log(
+        f"{name}: {wdl.count(WIN)} wins, {wdl.count(LOSS)} losses, "
+        f"longest {max(dtm)} plies"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate endgame tablebases")
+    parser.add_argument("sets", nargs="+", help='material sets, e.g. "KQK"')
+    parser.add_argument("--directory", default="tablebases")
+    args = parser.parse_args()
+    for name in args.sets:
+        generate(name, args.directory)
+
+
+if __name__ == "__main__":
+    main()
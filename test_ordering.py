@@ -0,0 +1,24 @@
+from brain import PIECE_CODES, encode_move
+from ordering import MoveOrderer
+
+
+def _squares(placement):
+    """
+    Piece codes by square for a dict of square to piece letter.
+    """
+    squares = bytearray(64)
+    for sq, piece in placement.items():
+        squares[sq] = PIECE_CODES[piece]
+    return squares
+
+
+def test_pawn_takes_queen_before_king_takes_queen():
+    # Black queen on d4, white pawn on e3 and white king on d3
+    squares = _squares({35: "q", 44: "P", 43: "K"})
+    pawn_takes = encode_move(44, 35, "q")
+    king_takes = encode_move(43, 35, "q")
+    orderer = MoveOrderer()
+
+    for moves in ([king_takes, pawn_takes], [pawn_takes, king_takes]):
+        assert orderer.order(squares, moves, 0) == [pawn_takes, king_takes]
+        assert orderer.order_captures(squares, moves) == [pawn_takes, king_takes]
@@ -0,0 +1,188 @@
+"""
+Multi-process tournament runner for bot-vs-bot matches.
+
+Plays every pairing from every opening with both colour assignments across a
+process pool, one headless game per worker at a time. Each game is written as
+a JSON line as soon as it finishes, followed by a summary line per pairing
+with the first engine's wins, draws and losses, and each engine's average move
+latency and nodes per second.
+
+Example:
+    python tournament.py --pairing search:0.05 random --games 64 --workers 32
+"""
+
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+
+from selfplay import ENGINES, OPENINGS, board_after, create_engine, play_game
+
+
+def _engine_spec(spec):
+    if spec.partition(":")[0] not in ENGINES:
+        raise argparse.ArgumentTypeError(f"unknown engine {spec!r}")
+    return spec
+
+
+def _play(job):
+    """
+    Worker entry point: plays one game and tags it with the job details.
+    """
+    number, pairing, opening, first_is_white, max_plies = job
+    first, second = (create_engine(spec) for spec in pairing)
+    white, black = (first, second) if first_is_white else (second, first)
+    opening_moves = OPENINGS[opening]
+    game = play_game(
+        white,
+        black,
+        board=board_after(opening_moves),
+        max_plies=max_plies,
+        is_white=len(opening_moves) % 2 == 0,
+    )
+    game.update(
+        {
+            "game": number,
+            "pairing": list(pairing),
+            "opening": opening,
+            "white": pairing[0] if first_is_white else pairing[1],
+            "black": pairing[1] if first_is_white else pairing[0],
+            "first_is_white": first_is_white,
+        }
+    )
+    return game
+
+
+def schedule(pairings, openings, games, max_plies):
+    """
+    Lists the jobs for a tournament, cycling through openings and alternating
+    colours so each opening is played from both sides.
+    """
+    jobs = []
+    for pairing in pairings:
+        for index in range(games):
+            opening = openings[(index // 2) % len(openings)]
+            jobs.append(
+                (len(jobs) + 1, tuple(pairing), opening, index % 2 == 0, max_plies)
+            )
+    return jobs
+
+
+class Standings:
+    """
+    Running win/draw/loss and speed totals per pairing.
+    """
+
+    def __init__(self):
+        self.pairings = {}
+
+    def add(self, game):
+        pairing = tuple(game["pairing"])
+        totals = self.pairings.setdefault(
+            pairing,
+            {
+                "wins": 0,
+                "draws": 0,
+                "losses": 0,
+                "engines": {
+                    spec: {"moves": 0, "seconds": 0.0, "nodes": 0} for spec in pairing
+                },
+            },
+        )
+        # Taken from the schedule, the specs alone cannot tell an engine
+        # playing itself apart
+        first_is_white = game["first_is_white"]
+        if game["result"] == "1/2-1/2":
+            totals["draws"] += 1
+        elif (game["result"] == "1-0") == first_is_white:
+            totals["wins"] += 1
+        else:
+            totals["losses"] += 1
+
+        # With identical specs on both sides both colours count for it
+        for color, spec in (("w", game["white"]), ("b", game["black"])):
+            engine = totals["engines"][spec]
+            for key in ("moves", "seconds", "nodes"):
+                engine[key] += game["stats"][color][key]
+
+    def summary(self):
+        lines = []
+        for pairing, totals in self.pairings.items():
+            engines = {}
+            for spec, engine in totals["engines"].items():
+                moves, seconds = engine["moves"], engine["seconds"]
+                engines[spec] = {
+                    "avg_move_ms": round(1000 * seconds / moves, 3) if moves else None,
+                    "nps": round(engine["nodes"] / seconds) if seconds else None,
+                }
+            lines.append(
+                {
+                    "pairing": list(pairing),
+                    "games": totals["wins"] + totals["draws"] + totals["losses"],
+                    "wins": totals["wins"],
+                    "draws": totals["draws"],
+                    "losses": totals["losses"],
+                    "engines": engines,
+                }
+            )
+        return lines
+
+
+def run(jobs, workers, out):
+    """
+    Plays the jobs across a process pool, streaming each game as it ends.
+
+    Returns:
+        The summary lines, which are also written to out.
+    """
+    standings = Standings()
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        for game in pool.imap_unordered(_play, jobs):
+            standings.add(game)
+            out.write(json.dumps(game) + "\n")
+            out.flush()
+    summary = standings.summary()
+    for line in summary:
+        line["seconds"] = round(time.perf_counter() - start, 3)
+        out.write(json.dumps({"summary": line}) + "\n")
+    out.flush()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bot-vs-bot tournament")
+    parser.add_argument(
+        "--pairing",
+        nargs=2,
+        action="append",
+        type=_engine_spec,
+        metavar=("ENGINE", "OPPONENT"),
+        help='engines as "name" or "name:time_limit", e.g. search:0.05 random',
+    )
+    parser.add_argument(
+        "--games", type=int, default=16, help="games per pairing, colours alternate"
+    )
+    parser.add_argument(
+        "--openings", nargs="+", choices=OPENINGS, default=list(OPENINGS)
+    )
+    parser.add_argument("--max-plies", type=int, default=200)
+    parser.add_argument(
+        "--workers", type=int, default=multiprocessing.cpu_count(), help="processes"
+    )
+    parser.add_argument("--output", help="write the JSON lines to this file")
+    args = parser.parse_args()
+
+    pairings = args.pairing or [["search:0.05", "random"]]
+    jobs = schedule(pairings, args.openings, args.games, args.max_plies)
+    out = open(args.output, "w") if args.output else sys.stdout
+    try:
+        run(jobs, args.workers, out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
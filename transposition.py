@@ -0,0 +1,130 @@
+"""
+Zobrist hashing and a fixed-size transposition table for the search.
+"""
+
+import random
+from array import array
+
+# Fixed seed so every process derives the same keys for the same position
+_rng = random.Random(0x5CAC8B07)
+
+# 64-bit key per piece letter and square; empty squares hash to zero
+ZOBRIST = {
+    piece: tuple(_rng.getrandbits(64) for _ in range(64)) for piece in "PNBRQKpnbrqk"
+}
+ZOBRIST[" "] = (0,) * 64
+ZOBRIST_BLACK_TO_MOVE = _rng.getrandbits(64)
+
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+
+def hash_board(board, color):
+    """
+    Computes the Zobrist key of a board from scratch.
+
+    Args:
+        board: A 2D list representing the chessboard.
+        color: The side to move, "w" or "b".
+
+    Returns:
+        A 64-bit integer key. Moving a piece updates it incrementally with
+        key ^ ZOBRIST[piece][from] ^ ZOBRIST[piece][to] ^ ZOBRIST[captured][to]
+        ^ ZOBRIST_BLACK_TO_MOVE.
+    """
+    key = 0 if color == "w" else ZOBRIST_BLACK_TO_MOVE
+    for row in range(8):
+        for col in range(8):
+            key ^= ZOBRIST[board[row][col]][row * 8 + col]
+    return key
+
+
+class TranspositionTable:
+    """
+    Hash table of search results stored in preallocated arrays, so memory use
+    stays flat however long a session runs.
+
+    Each bucket holds two entries: a depth-preferred slot that only gives way
+    to an equal or deeper search of any position, and an always-replace slot
+    that takes everything else.
+
+    Args:
+        size_mb: Upper bound on the memory used by the entry arrays.
+    """
+
+    # key (8) + score (4) + move (2) + depth (1) + flag (1)
+    ENTRY_BYTES = 16
+
+    def __init__(self, size_mb=16):
+        buckets = max(1, size_mb * 1024 * 1024 // (2 * self.ENTRY_BYTES))
+        buckets = 1 << (buckets.bit_length() - 1)  # Power of two for masking
+        self.mask = buckets - 1
+        self.size = 2 * buckets
+        self.keys = array("Q", bytes(8 * self.size))
+        self.scores = array("i", bytes(4 * self.size))
+        self.moves = array("H", bytes(2 * self.size))
+        self.depths = array("b", bytes(self.size))
+        self.flags = array("B", bytes(self.size))
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def probe(self, key):
+        """
+        Looks a position up.
+
+        Returns:
+            A (depth, flag, score, move) tuple, or None if the key is absent.
+        """
+        index = (key & self.mask) << 1
+        keys = self.keys
+        if keys[index] != key:
+            index += 1
+            if keys[index] != key:
+                self.misses += 1
+                return None
+        self.hits += 1
+        return (
+            self.depths[index],
+            self.flags[index],
+            self.scores[index],
+            self.moves[index],
+        )
+
+    def store(self, key, depth, flag, score, move):
+        """
+        Records a search result, replacing an older one per the bucket policy.
+        """
+        index = (key & self.mask) << 1
+        if self.keys[index] != key and depth < self.depths[index]:
+            index += 1
+        self.keys[index] = key
+        self.depths[index] = depth
+        self.flags[index] = flag
+        self.scores[index] = score
+        self.moves[index] = move
+        self.stores += 1
+
+    def clear(self):
+        """
+        Empties the table and resets its statistics.
+        """
+        self.keys = array("Q", bytes(8 * self.size))
+        self.depths = array("b", bytes(self.size))
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def stats(self):
+        """
+        Returns hit/miss counters and how full the table is.
+        """
+        probes = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": self.hits / probes if probes else 0.0,
+            "fill": sum(1 for key in self.keys if key) / self.size,
+        }